@@ -1,12 +1,20 @@
+import asyncio
+import hashlib
 import json
+import os
+import tempfile
 import time
 import httpx
+import orjson
 from mcp.server.fastmcp import FastMCP
 from packages.openapi_client import OpenAPIClient
 from .register_openapi_tools import register_openapi_tools
 from argparse import ArgumentParser
 from typing import Optional, Dict
 
+# Refresh OAuth2 tokens this many seconds before they expire, to absorb clock skew and request latency
+TOKEN_SKEW = 60
+
 
 def load_openapi_spec(openapi_source):
     """Load OpenAPI spec from either a local file or a URL."""
@@ -14,16 +22,18 @@ def load_openapi_spec(openapi_source):
         try:
             response = httpx.get(openapi_source, timeout=10)
             response.raise_for_status()
-            return response.json()
+            return orjson.loads(response.content)
         except httpx.HTTPStatusError as e:
             raise ValueError(f"Error fetching OpenAPI spec from URL: {e}")
+        except orjson.JSONDecodeError:
+            raise ValueError(f"Error: Failed to parse JSON from URL: {openapi_source}")
     else:
         try:
-            with open(openapi_source, "r", encoding="utf-8") as openapi_spec_file:
-                return json.load(openapi_spec_file)
+            with open(openapi_source, "rb") as openapi_spec_file:
+                return orjson.loads(openapi_spec_file.read())
         except FileNotFoundError:
             raise ValueError(f"Error: File not found: {openapi_source}")
-        except json.JSONDecodeError:
+        except orjson.JSONDecodeError:
             raise ValueError(f"Error: Failed to parse JSON from file: {openapi_source}")
 
 
@@ -38,18 +48,20 @@ class AuthenticatedOpenAPIClient(OpenAPIClient):
         oauth2_token_url (str): OAuth2 Token URL.
         access_token (str): The current access token.
         token_expires_at (float): Expiration time of the token in UNIX timestamp.
+        token_cache_path (str): File the OAuth2 token is persisted to between runs (only if `cache_dir` is given).
     """
 
     def __init__(
         self,
         openapi_spec,
         headers: Optional[Dict[str, str]] = None,
+        cache_dir: Optional[str] = None,
         oauth2_client_id: Optional[str] = None,
         oauth2_client_secret: Optional[str] = None,
         oauth2_token_url: Optional[str] = None,
         oauth2_scopes: Optional[str] = None,
     ):
-        super().__init__(openapi_spec)
+        super().__init__(openapi_spec, cache_dir=cache_dir)
         self.custom_headers = headers or {}
         self.oauth2_client_id = oauth2_client_id
         self.oauth2_client_secret = oauth2_client_secret
@@ -57,8 +69,42 @@ class AuthenticatedOpenAPIClient(OpenAPIClient):
         self.oauth2_scopes = oauth2_scopes
         self.access_token = None
         self.token_expires_at = 0  # Store token expiration time
+        self._refresh_lock = asyncio.Lock()  # Only one caller refreshes an expired token at a time
+
+        # Reuse a still valid token from a previous run instead of hitting the token endpoint on startup
+        self.token_cache_path = None
+        if cache_dir and oauth2_client_id and oauth2_client_secret and oauth2_token_url:
+            token_key = hashlib.sha256(f"{oauth2_client_id}\n{oauth2_token_url}\n{oauth2_scopes or ''}".encode()).hexdigest()
+            self.token_cache_path = os.path.join(cache_dir, "tokens", token_key)
+            self._load_token()
 
-    def _fetch_oauth2_token(self):
+    def _load_token(self):
+        """
+        Loads a persisted OAuth2 token, if one exists.
+        """
+        try:
+            with open(self.token_cache_path, "rb") as token_file:
+                token_data = orjson.loads(token_file.read())
+            self.access_token = token_data["access_token"]
+            self.token_expires_at = token_data["expires_at"]
+        except (OSError, KeyError, TypeError, orjson.JSONDecodeError):
+            pass
+
+    def _save_token(self):
+        """
+        Persists the current OAuth2 token to a file that is only readable by the current user.
+        """
+        token_dir = os.path.dirname(self.token_cache_path)
+        try:
+            os.makedirs(token_dir, mode=0o700, exist_ok=True)
+            file_descriptor, tmp_path = tempfile.mkstemp(dir=token_dir, suffix=".tmp")  # Created with mode 0600
+            with os.fdopen(file_descriptor, "wb") as token_file:
+                token_file.write(orjson.dumps({"access_token": self.access_token, "expires_at": self.token_expires_at}))
+            os.replace(tmp_path, self.token_cache_path)
+        except OSError:
+            pass
+
+    async def _fetch_oauth2_token(self):
         """
         Fetches an OAuth2 token using the client credentials grant.
         """
@@ -66,26 +112,28 @@ class AuthenticatedOpenAPIClient(OpenAPIClient):
             return
 
         try:
-            response = httpx.post(
+            # Reuse the pooled client, and send the client credentials with HTTP Basic auth (RFC 6749, section 2.3.1)
+            response = await self._http.post(
                 self.oauth2_token_url,
                 data={
                     "grant_type": "client_credentials", 
-                    "scope": self.oauth2_scopes, 
-                    "client_id": self.oauth2_client_id, 
-                    "client_secret": self.oauth2_client_secret
+                    "scope": self.oauth2_scopes
                 },
                 headers={"Content-Type": "application/x-www-form-urlencoded"},
+                auth=(self.oauth2_client_id, self.oauth2_client_secret),
             )
             response.raise_for_status()
             token_data = response.json()
             self.access_token = token_data.get("access_token")
             expires_in = token_data.get("expires_in", 3600)  # Default 1 hour
-            self.token_expires_at = time.time() + expires_in - 30  # Refresh 30 sec before expiration
+            self.token_expires_at = time.time() + expires_in
+            if self.token_cache_path:
+                self._save_token()
 
         except httpx.HTTPStatusError as e:
             raise ValueError(f"Error fetching OAuth2 token: {e}")
 
-    def get_headers(self):
+    async def get_headers(self):
         """
         Returns headers, including authentication headers (API keys or OAuth2 Bearer token).
 
@@ -95,12 +143,45 @@ class AuthenticatedOpenAPIClient(OpenAPIClient):
 
         # Handle OAuth2 token
         if self.oauth2_client_id and self.oauth2_client_secret and self.oauth2_token_url:
-            if not self.access_token or time.time() >= self.token_expires_at:
-                self._fetch_oauth2_token()
+            if not self.access_token or time.time() + TOKEN_SKEW >= self.token_expires_at:
+                async with self._refresh_lock:
+                    # Re-check: another caller may have refreshed the token while we waited for the lock
+                    if not self.access_token or time.time() + TOKEN_SKEW >= self.token_expires_at:
+                        await self._fetch_oauth2_token()
             headers["Authorization"] = f"Bearer {self.access_token}"
 
         return headers
 
+    async def handle_unauthorized(self):
+        """
+        Discards the current OAuth2 token when the API rejects it, so the request is retried with a new one.
+        """
+        if not self.oauth2_client_id or not self.oauth2_client_secret or not self.oauth2_token_url:
+            return False
+
+        async with self._refresh_lock:
+            self.access_token = None
+            self.token_expires_at = 0
+        return True
+
+
+async def serve(openapi_client: AuthenticatedOpenAPIClient, transport: str, port: int):
+    """Registers the OpenAPI operations and runs the MCP Server on the current event loop."""
+    # Closed together with its connection pool when the server stops
+    async with openapi_client:
+
+        # Create MCP Server
+        mcp_server = FastMCP("OpenAPI", port=port)
+
+        # Register OpenAPI operations in MCP Server
+        register_openapi_tools(openapi_client, mcp_server)
+
+        # Run the MCP Server
+        if transport == "sse":
+            await mcp_server.run_sse_async()
+        else:
+            await mcp_server.run_stdio_async()
+
 
 def main():
     parser = ArgumentParser(description="FastMCP Server for OpenAPI-based APIs")
@@ -108,6 +189,8 @@ def main():
     parser.add_argument("--openapi", type=str, required=True, help="Path to OpenAPI spec (JSON file or URL)")
     parser.add_argument("--port", type=int, default=8000, help="Port to run FastMCP server on (only for SSE transport)")
     parser.add_argument("--headers", type=str, default="{}", help="Custom headers in JSON format (e.g., '{\"Authorization\": \"Bearer XYZ\"}')")
+    parser.add_argument("--cache-dir", type=str, default=os.path.join(os.path.expanduser("~"), ".cache", "fastmcp-openapi"), help="Directory for caching the validated OpenAPI spec")
+    parser.add_argument("--no-cache", action="store_true", help="Disable caching of the validated OpenAPI spec")
 
     # OAuth2 Arguments
     parser.add_argument("--oauth2-client-id", type=str, help="OAuth2 Client ID")
@@ -128,24 +211,21 @@ def main():
     except ValueError:
         raise ValueError("Error: --headers must be a valid JSON object (e.g., '{\"Authorization\": \"Bearer XYZ\"}')")
 
+    if args.transport not in ("stdio", "sse"):
+        raise ValueError(f"Unknown transport: {args.transport}")
+
     # Create an authenticated OpenAPI client
     openapi_client = AuthenticatedOpenAPIClient(
         openapi_spec,
         headers=custom_headers,
+        cache_dir=None if args.no_cache else args.cache_dir,
         oauth2_client_id=args.oauth2_client_id,
         oauth2_client_secret=args.oauth2_client_secret,
         oauth2_token_url=args.oauth2_token_url,
         oauth2_scopes=args.oauth2_scopes,
     )
 
-    # Create MCP Server
-    mcp_server = FastMCP("OpenAPI", port=args.port)
-
-    # Register OpenAPI operations in MCP Server
-    register_openapi_tools(openapi_client, mcp_server)
-    
-    # Run the MCP Server
-    mcp_server.run(args.transport)
+    asyncio.run(serve(openapi_client, args.transport, args.port))
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
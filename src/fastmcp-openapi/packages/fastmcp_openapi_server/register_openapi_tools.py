@@ -1,7 +1,10 @@
-import inspect
 import functools
+import tempfile
+import httpx
+import orjson
 from mcp.server.fastmcp import FastMCP
 from packages.openapi_client import OpenAPIClient
+from packages.openapi_client.type_definitions import OpenAPIOperationPlan
 from typing import Any, Literal, Optional
 import re
 
@@ -15,19 +18,36 @@ OPENAPI_TO_PYTHON = {
     "object": dict
 }
 
+_SANITIZE_PARAM_RE = re.compile(r'\W|^(?=\d)')
+
+# Responses above this size, or with a binary content type, are streamed to a file instead of read into memory
+MAX_INLINE_RESPONSE_SIZE = 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
+
 def sanitize_parameter_name(name: str) -> str:
     # Replace invalid characters with underscores
-    sanitized = re.sub(r'\W|^(?=\d)', '_', name)
+    sanitized = _SANITIZE_PARAM_RE.sub('_', name)
     return sanitized
 
 
+@functools.lru_cache(maxsize=4096)
+def _python_type_for(openapi_type: str, enum: tuple) -> Any:
+    if enum:
+        return Literal[enum]  # Convert enum to Literal
+
+    return OPENAPI_TO_PYTHON.get(openapi_type, str)  # Fallback to str if type is unknown
+
+
 def get_python_type(schema: dict) -> Any:
     """Maps OpenAPI types to Python types, handling enums correctly."""
-    if "enum" in schema:
-        return Literal[tuple(schema["enum"])]  # Convert enum to Literal
-    
     openapi_type = schema.get("type", "string")  # Default to string if type is missing
-    return OPENAPI_TO_PYTHON.get(openapi_type, str)  # Fallback to str if type is unknown
+    enum = tuple(schema["enum"]) if "enum" in schema else ()
+    try:
+        # Most parameters share a handful of schemas, so the (memoized) mapping is computed once per schema shape
+        return _python_type_for(openapi_type, enum)
+    except TypeError:
+        # Unhashable type or enum values (e.g. objects) cannot be cached
+        return _python_type_for.__wrapped__(openapi_type, enum)
 
 
 def get_operation_description(operation: dict, param_descriptions: str) -> str:
@@ -43,6 +63,84 @@ def get_operation_description(operation: dict, param_descriptions: str) -> str:
     return f"{base_desc}\n\n**Parameters:**\n{param_descriptions}"
 
 
+def is_inline_response(response: httpx.Response) -> bool:
+    """Whether a response is small textual content (JSON, text) that can be returned as is."""
+    content_type = response.headers.get("content-type", "").lower()
+    if content_type and not (content_type.startswith("text/") or "json" in content_type or "xml" in content_type):
+        return False
+
+    content_length = response.headers.get("content-length")
+    return not (content_length and content_length.isdigit() and int(content_length) > MAX_INLINE_RESPONSE_SIZE)
+
+
+async def save_response_to_file(response: httpx.Response) -> dict:
+    """Streams a response body to a temporary file, chunk by chunk, and returns where it was saved."""
+    size = 0
+    with tempfile.NamedTemporaryFile(prefix="fastmcp-openapi-", delete=False) as response_file:
+        async for chunk in response.aiter_bytes(chunk_size=STREAM_CHUNK_SIZE):
+            response_file.write(chunk)
+            size += len(chunk)
+
+    return {
+        "status_code": response.status_code,
+        "content_type": response.headers.get("content-type"),
+        "size": size,
+        "file": response_file.name,
+    }
+
+
+async def call_operation(client: OpenAPIClient, plan: OpenAPIOperationPlan, kwargs: dict) -> Any:
+    """Invokes an OpenAPI operation and returns its (decoded) response."""
+    response = await client.invoke_prepared(plan, kwargs, stream=True)
+    try:
+        if not is_inline_response(response):
+            return await save_response_to_file(response)
+
+        await response.aread()
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError:
+            return response.text
+    finally:
+        await response.aclose()
+
+
+def build_tool_function(client: OpenAPIClient, plan: OpenAPIOperationPlan, parsed_params: list):
+    """
+    Generates the source of a tool function with the exact signature of the operation, e.g.
+
+        async def tool(user_id, verbose=None):
+            return await _call_operation(_client, _plan, {'user-id': user_id, 'verbose': verbose})
+
+    so tool arguments are bound by the interpreter and mapped back to the parameter names from the spec,
+    without a `functools.partial` and `**kwargs` indirection on every call.
+    """
+    required_args = []
+    optional_args = []
+    annotations = {}
+    for _, arg_name, param_type, required in parsed_params:
+        if required:
+            required_args.append(arg_name)
+            annotations[arg_name] = param_type
+        else:
+            optional_args.append(f"{arg_name}=None")  # Ensure required arguments come first
+            annotations[arg_name] = Optional[param_type]
+
+    arguments = ", ".join(required_args + optional_args)
+    kwargs = ", ".join(f"{name!r}: {arg_name}" for name, arg_name, _, _ in parsed_params)
+    source = (
+        f"async def tool({arguments}):\n"
+        f"    return await _call_operation(_client, _plan, {{{kwargs}}})\n"
+    )
+
+    namespace = {"_call_operation": call_operation, "_client": client, "_plan": plan}
+    exec(compile(source, f"<tool {plan.method} {plan.url_template}>", "exec"), namespace)
+
+    tool_func = namespace["tool"]
+    tool_func.__annotations__ = annotations
+    return tool_func
+
+
 def register_openapi_tools(client: OpenAPIClient, mcp_server: FastMCP):
     """Registers all OpenAPI operations as tools in FastMCP."""
     
@@ -53,86 +151,30 @@ def register_openapi_tools(client: OpenAPIClient, mcp_server: FastMCP):
         parameters = operation["details"].get("parameters", [])
         request_body = operation["details"].get("requestBody", {})
 
-        # Separate required and optional parameters
-        required_params = []
-        optional_params = []
-        param_descriptions = []
-
-        # Extract path/query/header parameters with correct types
-        for param in parameters:
-            param_name = sanitize_parameter_name(param["name"])
-            param_schema = param.get("schema", {})
-            param_type = get_python_type(param_schema)  # Determine correct type
-            required = param.get("required", False)  # Check if required
-
-            # Format parameter description
-            param_description = f"- `{param_name}` ({param_type.__name__})"
-            if not required:
-                param_description += " (Optional)"
-            param_descriptions.append(param_description)
-
-            # Define parameter signature
-            param_def = inspect.Parameter(
-                param_name,
-                inspect.Parameter.POSITIONAL_OR_KEYWORD,
-                annotation=param_type
-            )
-
-            if required:
-                required_params.append(param_def)
-            else:
-                optional_params.append(param_def.replace(default=None, annotation=Optional[param_type]))
+        # Collect (name, tool argument name, type, required) of the path/query/header parameters and body properties
+        parsed_params = [
+            (param["name"], sanitize_parameter_name(param["name"]), get_python_type(param.get("schema", {})), param.get("required", False))
+            for param in parameters
+        ]
 
         # Extract body parameters (if requestBody exists)
         if request_body:
             schema = request_body.get("content", {}).get("application/json", {}).get("schema", {})
             required_fields = schema.get("required", [])  # List of required fields
-
             for prop_name, prop_details in schema.get("properties", {}).items():
-                orig_prop_name = prop_name
-                prop_name = sanitize_parameter_name(orig_prop_name)
-                prop_type = get_python_type(prop_details)
-
-                param_description = f"- `{prop_name}` ({prop_type.__name__})"
-                if prop_name not in required_fields:
-                    param_description += " (Optional)"
-                param_descriptions.append(param_description)
-
-                param_def = inspect.Parameter(
-                    prop_name,
-                    inspect.Parameter.POSITIONAL_OR_KEYWORD,
-                    annotation=prop_type
-                )
-
-                if prop_name in required_fields:
-                    required_params.append(param_def)
-                else:
-                    optional_params.append(param_def.replace(default=None, annotation=Optional[prop_type]))
-
-        # Ensure required arguments come first
-        param_defs = required_params + optional_params
-
-        # Generate dynamic function signature
-        func_signature = inspect.Signature(parameters=param_defs)
+                parsed_params.append((prop_name, sanitize_parameter_name(prop_name), get_python_type(prop_details), prop_name in required_fields))
 
         # Get description/summary including parameter details
-        formatted_param_descriptions = "\n".join(param_descriptions)
+        formatted_param_descriptions = "\n".join(
+            f"- `{arg_name}` ({param_type.__name__}){'' if required else ' (Optional)'}"
+            for _, arg_name, param_type, required in parsed_params
+        )
         operation_description = get_operation_description(operation["details"], formatted_param_descriptions)
 
-        # Define the function dynamically using `functools.partial`
-        def wrapped_func(operation_id, **kwargs):
-            """Wrapped function that invokes OpenAPI operations."""
-            response = client.invoke_operation(operation_id, **kwargs)
-            try:
-                return response.json()
-            except: 
-                return response.text
-
-        wrapped_func = functools.partial(wrapped_func, operation_id)  # Bind `operation_id`
-        functools.update_wrapper(wrapped_func, client.invoke_operation)  # Preserve metadata
-
-        # Assign the dynamically generated signature
-        wrapped_func.__signature__ = func_signature
+        # Interpret the spec once at registration, so tool calls only dispatch on the precomputed plan
+        plan = client.prepare_operation(operation_id)
 
-        # Register the function in FastMCP
-        mcp_server.add_tool(wrapped_func, operation_id, description=operation_description)
+        # Register the generated function in FastMCP
+        tool_func = build_tool_function(client, plan, parsed_params)
+        tool_func.__doc__ = operation_description
+        mcp_server.add_tool(tool_func, operation_id, description=operation_description)
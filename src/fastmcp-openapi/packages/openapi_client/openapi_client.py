@@ -1,17 +1,33 @@
+import hashlib
+import os
+import tempfile
 import httpx
+import orjson
 import re
-from typing import List
-from packages.openapi_client.type_definitions.type_definitions import OpenAPIOperation, OpenAPISpec
+from typing import List, Optional
+from packages.openapi_client.type_definitions.type_definitions import OpenAPIOperation, OpenAPIOperationPlan, OpenAPISpec
 from openapi_spec_validator import validate
 from openapi_spec_validator.versions.shortcuts import get_spec_version
 from openapi_spec_validator.versions import consts as versions
 import jsonref
 
+_PATH_QUERY_RE = re.compile(r'\{\?.*?\}')  # `{?query}` part of a path
+_PATH_PARAM_RE = re.compile(r'\{.*?\}')  # `{path}` params
+_NON_WORD_RE = re.compile(r'[^a-zA-Z0-9_]')
+
+
+class _PathParams(dict):
+    """Path parameter values for `str.format_map()`, reporting a missing parameter instead of a bare KeyError."""
+
+    def __missing__(self, key):
+        raise ValueError(f"Missing required path parameter: {key}")
+
+
 class OpenAPIClient:
     """
     A dynamic OpenAPI client for invoking HTTP requests based on operationId from the OpenAPI specification.
 
-    This class loads an OpenAPI spec at runtime and dynamically constructs and invokes HTTP requests
+    This class loads an OpenAPI spec at runtime and dynamically constructs and invokes asynchronous HTTP requests
     using the provided operationId. The client also allows for the injection of custom headers (e.g., authentication tokens)
     by overriding the `get_headers()` method.
 
@@ -24,48 +40,94 @@ class OpenAPIClient:
         get_operation_by_id(operation_id: str):
             Retrieve the details of an API operation by its operationId.
         invoke_operation(operation_id: str, **kwargs):
-            Invoke an API operation dynamically using the provided operationId and parameters.
+            Invoke (await) an API operation dynamically using the provided operationId and parameters.
+        prepare_operation(operation_id: str):
+            Precompute the dispatch plan of an operation for use with `invoke_prepared()`.
+        aclose():
+            Close the underlying HTTP client. The client can also be used as an async context manager.
     """
     
-    def __init__(self, openapi_spec: OpenAPISpec):
+    def __init__(self, openapi_spec: OpenAPISpec, cache_dir: Optional[str] = None):
         """
         Initialize the OpenAPIClient.
 
         Args:
             openapi_spec (OpenAPISpec): A OpenAPI specification). 
                 Either `open_file_path` or `openapi_file_path` must be provided, but not both.
+            cache_dir (str, optional): Directory where the resolved and validated specification is cached,
+                keyed by the SHA-256 of the specification. Caching is disabled when not provided.
         """
-        if openapi_spec:
-            self.spec = openapi_spec
-        else:
+        if not openapi_spec:
             raise ValueError("Either openapi_file_path or openapi_spec must be provided.")
+
+        cache_path = self._get_spec_cache_path(openapi_spec, cache_dir) if cache_dir else None
+        cached_spec = self._load_cached_spec(cache_path) if cache_path else None
+
+        if cached_spec is not None:
+            # Resolved and validated by an earlier run, skip jsonref and the validator
+            self.spec = cached_spec
+        else:
+            # Resolve all $refs eagerly into plain dicts: no JsonRef proxies means no per-access indirection later on
+            self.spec = jsonref.replace_refs(openapi_spec, proxies=False, lazy_load=False)
+
+            try:
+                spec_version = get_spec_version(self.spec)
+                if (spec_version != versions.OPENAPIV30 and spec_version != versions.OPENAPIV31):
+                    raise ValueError("OpenAPI version must be 3.0 or 3.1")
+
+                validate(self.spec)
+            except Exception as error:
+                raise ValueError(f"OpenAPI specification is not valid: {error}")
+
+            # Generate the operationIds missing from the spec
+            for path, path_item in self.spec['paths'].items():
+                for method, operation in path_item.items():
+                    if 'operationId' not in operation:
+                        operation['operationId'] = self._generate_operation_id(method, path)
+
+            if cache_path:
+                self._save_cached_spec(cache_path, self.spec)
+
+        # The spec is immutable from here on, so the operation list is built only once
+        self._operations = [
+            OpenAPIOperation(path=path, method=method, details=operation)
+            for path, path_item in self.spec['paths'].items()
+            for method, operation in path_item.items()
+        ]
+        self._operations_by_id = {
+            operation["details"].get('operationId'): operation
+            for operation in self._operations
+            if isinstance(operation["details"], dict)
+        }
+        self._plans = {}
+
+        # Persistent async HTTP client so consecutive invocations reuse pooled keep-alive connections,
+        # multiplexed over a single HTTP/2 connection where the API supports it, without blocking the event loop
+        self._http = httpx.AsyncClient(
+            base_url=self.spec['servers'][0]['url'],
+            http2=True,
+            limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+        )
+
+    async def aclose(self):
+        """
+        Close the underlying HTTP client and release its pooled connections.
+        """
+        await self._http.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.aclose()
         
-        self.spec = jsonref.replace_refs(openapi_spec)
-        
-        try:
-            spec_version = get_spec_version(self.spec)
-            if (spec_version != versions.OPENAPIV30 and spec_version != versions.OPENAPIV31):
-                raise ValueError("OpenAPI version must be 3.0 or 3.1")
-            
-            validate(self.spec)
-        except Exception as error:
-            raise ValueError(f"OpenAPI specification is not valid: {error}")
-        
-        # Check if operation_id is missing
-        missing_operation_ids = []
-        for path, path_item in self.spec['paths'].items():
-            for method, operation in path_item.items():
-                if 'operationId' not in operation:
-                    missing_operation_ids.append(f"{method.upper()} {path}")
-        if missing_operation_ids:
-            self._add_operation_ids(self.spec)
-        
-    def get_headers(self):
+    async def get_headers(self):
         """
         Overridable method for users to inject custom headers, such as authentication.
 
         This method can be overridden by users to return headers like authentication tokens,
-        API keys, or any custom headers required for API requests.
+        API keys, or any custom headers required for API requests. It is a coroutine, so fetching
+        a token does not block the event loop.
 
         Returns:
             dict: A dictionary of headers to be included in the request. By default, it returns an empty dictionary.
@@ -94,6 +156,18 @@ class OpenAPIClient:
         """
         return {}
     
+    async def handle_unauthorized(self) -> bool:
+        """
+        Overridable method called when the API responds with 401 Unauthorized.
+
+        This method can be overridden by users to discard expired or revoked credentials
+        (e.g., a cached access token) before the request is retried.
+
+        Returns:
+            bool: True to retry the request once with fresh headers. By default, it returns False.
+        """
+        return False
+
     def get_operations(self) -> List[OpenAPIOperation]:
         """
         Retrieve all operations defined in the OpenAPI specification
@@ -101,12 +175,7 @@ class OpenAPIClient:
         Returns:
             list: A list of of OpenAPIOperation dicts.
         """
-        operations = []
-        for path, path_item in self.spec['paths'].items():
-            for method, operation in path_item.items():
-                operation = OpenAPIOperation(path=path, method=method, details=operation)
-                operations.append(operation)
-        return operations
+        return self._operations
     
     def get_operation_by_id(self, operation_id: str) -> OpenAPIOperation:
         """
@@ -121,14 +190,93 @@ class OpenAPIClient:
         Raises:
             ValueError: If the operationId is not found in the OpenAPI specification.
         """
-        # Find operation in the spec by operationId
-        operations = self.get_operations()
-        for operation in operations:
-            if isinstance(operation["details"], dict) and operation["details"].get('operationId') == operation_id:
-                return operation
-        raise ValueError(f"Operation {operation_id} not found in the spec")
+        operation = self._operations_by_id.get(operation_id)
+        if operation is None:
+            raise ValueError(f"Operation {operation_id} not found in the spec")
+        return operation
+
+    def prepare_operation(self, operation_id: str) -> OpenAPIOperationPlan:
+        """
+        Build (once) the dispatch plan for an operation, so that invoking it no longer has to interpret the spec.
+
+        Args:
+            operation_id (str): The operationId as defined in the OpenAPI specification.
+
+        Returns:
+            OpenAPIOperationPlan: HTTP method, URL template and the parameter names per location.
+
+        Raises:
+            ValueError: If the operationId is not found in the OpenAPI specification.
+        """
+        plan = self._plans.get(operation_id)
+        if plan is not None:
+            return plan
+
+        operation = self.get_operation_by_id(operation_id)
+        details = operation["details"]
+
+        locations = {'path': set(), 'query': set(), 'header': set()}
+        for parameter in details.get('parameters', []):
+            if parameter['in'] in locations:
+                locations[parameter['in']].add(parameter['name'])
+
+        schema = details.get('requestBody', {}).get('content', {}).get('application/json', {}).get('schema', {})
+
+        plan = OpenAPIOperationPlan(
+            method=operation["method"].upper(),
+            url_template=_PATH_QUERY_RE.sub('', operation["path"]),  # Remove the `{?query}` part from the path
+            path_params=frozenset(locations['path']),
+            query_params=frozenset(locations['query']),
+            header_params=frozenset(locations['header']),
+            body_properties=frozenset(schema.get('properties', {})),
+        )
+        self._plans[operation_id] = plan
+        return plan
+
+    async def invoke_prepared(self, plan: OpenAPIOperationPlan, kwargs: dict, stream: bool = False):
+        """
+        Invoke an API operation from a plan created by `prepare_operation()`.
 
-    def invoke_operation(self, operation_id: str, **kwargs):
+        Args:
+            plan (OpenAPIOperationPlan): The dispatch plan of the operation.
+            kwargs (dict): The parameters for the API call, keyed by parameter or body property name.
+            stream (bool, optional): Return before the response body is read. The caller then consumes the body
+                (e.g. with `aiter_bytes()`) and must close the response with `aclose()`.
+
+        Returns:
+            httpx.Response: The HTTP response object from the invoked API call.
+        """
+        path_params = _PathParams()
+        query_params = self.get_query_params()
+        headers = await self.get_headers()
+        body = self.get_body()
+
+        for name, value in kwargs.items():
+            if value is None:
+                continue
+            if name in plan.path_params:
+                path_params[name] = value
+            elif name in plan.query_params:
+                query_params[name] = value
+            elif name in plan.header_params:
+                headers[name] = value
+            if name in plan.body_properties:
+                body[name] = value
+
+        if body:
+            headers = httpx.Headers(headers)  # Case-insensitive, so a custom Content-Type header is kept
+            headers.setdefault("Content-Type", "application/json")
+
+        request = self._http.build_request(
+            method=plan.method,
+            url=plan.url_template.format_map(path_params),
+            params=query_params,
+            headers=headers,
+            content=orjson.dumps(body) if body else None
+        )
+        return await self._send(request, stream=stream)
+
+    async def invoke_operation(self, operation_id: str, **kwargs):
         """
         Invoke the API operation dynamically based on operationId.
 
@@ -142,7 +290,7 @@ class OpenAPIClient:
                      These can be path, query, header, or body parameters.
 
         Example:
-            response = client.invoke_operation(
+            response = await client.invoke_operation(
                 operation_id="getUser",
                 userId="123",  # Path parameter
                 includeDetails=True  # Query parameter
@@ -151,58 +299,46 @@ class OpenAPIClient:
         Returns:
             httpx.Response: The HTTP response object from the invoked API call.
         """
-        # Get the operation details using the operation_id
-        operation = self.get_operation_by_id(operation_id)
+        # Dispatch on the precomputed per-location parameter name sets instead of walking the spec on every call
+        return await self.invoke_prepared(self.prepare_operation(operation_id), kwargs)
 
-        # Prepare containers for path, query, header, and body parameters
-        path_params = {}
-        query_params = self.get_query_params()
-        headers = self.get_headers()
-        body = self.get_body()
+    async def _send(self, request: httpx.Request, stream: bool = False) -> httpx.Response:
+        response = await self._http.send(request, stream=stream)
 
-        # Automatically assign the provided kwargs to the correct parameter locations
-        for parameter in operation["details"].get('parameters', []):
-            param_name = parameter['name']
-            param_in = parameter['in']  # Can be 'path', 'query', 'header', etc.
-
-            if param_name in kwargs and kwargs[param_name] is not None:
-                if param_in == 'path':
-                    path_params[param_name] = kwargs[param_name]
-                elif param_in == 'query':
-                    query_params[param_name] = kwargs[param_name]
-                elif param_in == 'header':
-                    headers[param_name] = kwargs[param_name]
-        
-        # Handle request body if present
-        if 'requestBody' in operation["details"]:
-            schema = operation["details"]['requestBody']['content']['application/json']['schema']
-            for prop in schema['properties']:
-                if prop in kwargs and kwargs[prop] is not None:
-                    body[prop] = kwargs[prop]
-
-        # Dynamically construct the path URL, removing the optional query parameters from the path
-        base_url = self.spec['servers'][0]['url']  # Extract the base URL from the spec
-
-        # Extract query params embedded in the path
-        path = re.sub(r'\{\?.*?\}', '', operation["path"])  # Remove the `{?query}` part from the path
-        url = base_url + path.format(**path_params)
-
-        # Make the HTTP request
-        with httpx.Client() as client:
-            response = client.request(
-                method=operation["method"].upper(),
-                url=url,
-                params=query_params,  # Add query parameters here
-                headers=headers,  # Pass headers
-                json=body if body else None  # Pass body if applicable
-            )
+        # Retry once with fresh headers if the credentials were rejected and could be renewed
+        if response.status_code == 401 and await self.handle_unauthorized():
+            await response.aclose()
+            request.headers.update(await self.get_headers())
+            response = await self._http.send(request, stream=stream)
 
         return response
     
+    def _get_spec_cache_path(self, openapi_spec: OpenAPISpec, cache_dir: str) -> str:
+        key = hashlib.sha256(orjson.dumps(openapi_spec, option=orjson.OPT_SORT_KEYS)).hexdigest()
+        return os.path.join(cache_dir, f"{key}.json")
+
+    def _load_cached_spec(self, cache_path: str) -> Optional[OpenAPISpec]:
+        try:
+            with open(cache_path, "rb") as cache_file:
+                return orjson.loads(cache_file.read())
+        except (OSError, orjson.JSONDecodeError):
+            return None
+
+    def _save_cached_spec(self, cache_path: str, spec: OpenAPISpec):
+        # The cache is best effort: recursive (unserializable) specs and unwritable directories are skipped
+        try:
+            data = orjson.dumps(spec)
+            os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+            with tempfile.NamedTemporaryFile(dir=os.path.dirname(cache_path), suffix=".tmp", delete=False) as tmp_file:
+                tmp_file.write(data)
+            os.replace(tmp_file.name, cache_path)  # Atomic, so concurrent starts never read a partial file
+        except (OSError, orjson.JSONEncodeError):
+            pass
+
     def _sanitize_path(self, path: str) -> str:
-        path = re.sub(r'\{.*?\}', '', path)  # Remove {path} params
+        path = _PATH_PARAM_RE.sub('', path)  # Remove {path} params
         path = path.strip("/").replace("/", "_")  # Replace / with _
-        path = re.sub(r'[^a-zA-Z0-9_]', '', path)  # Remove special characters
+        path = _NON_WORD_RE.sub('', path)  # Remove special characters
         return path
         
     def _generate_operation_id(self, method, path):
@@ -213,13 +349,4 @@ class OpenAPIClient:
         components = sanitized_path.split("_")
         readable_path = "".join(word.capitalize() for word in components)
 
-        return f"{method}{readable_path}"  # Example: getUserById
-
-    def _add_operation_ids(self, openapi_spec):
-        # Loop through all paths in the spec
-        for path, path_item in openapi_spec.get('paths', {}).items():
-            for method, operation in path_item.items(): # Loop through all methods (get, post, etc.) for each path
-                if 'operationId' not in operation:
-                    operation_id = self._generate_operation_id(method, path)
-                    operation['operationId'] = operation_id
-        return openapi_spec
\ No newline at end of file
+        return f"{method}{readable_path}"  # Example: getUserById
\ No newline at end of file
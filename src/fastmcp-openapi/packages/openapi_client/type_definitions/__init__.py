@@ -1 +1 @@
-from .type_definitions import OpenAPIOperation, OpenAPISpec
\ No newline at end of file
+from .type_definitions import OpenAPIOperation, OpenAPIOperationPlan, OpenAPISpec
\ No newline at end of file
@@ -1,4 +1,4 @@
-from typing import TypedDict, Dict, Any
+from typing import TypedDict, NamedTuple, FrozenSet, Dict, Any
 
 class OpenAPIOperation(TypedDict):
     path=str,
@@ -10,4 +10,13 @@ class OpenAPISpec(TypedDict):
     info: Dict[str, Any]
     servers: Dict[str, Any]
     paths: Dict[str, Any]
-    components: Dict[str, Any]
\ No newline at end of file
+    components: Dict[str, Any]
+
+class OpenAPIOperationPlan(NamedTuple):
+    """Pre-interpreted dispatch information for a single operation."""
+    method: str
+    url_template: str
+    path_params: FrozenSet[str]
+    query_params: FrozenSet[str]
+    header_params: FrozenSet[str]
+    body_properties: FrozenSet[str]
\ No newline at end of file
@@ -7,11 +7,22 @@ using the OpenAPI specification. It helps language models understand how to use
 the ThingsBoard API effectively.
 """
 
-import json
+import heapq
+import mmap
+import os
+import pickle
+import sys
+import tempfile
+import threading
+from bisect import bisect_right
+from collections import Counter, OrderedDict
 from pathlib import Path
+from types import MappingProxyType
 from typing import Dict, List, Optional, Any
 
+import ahocorasick
 import jsonref
+import orjson
 from mcp.server.fastmcp import FastMCP
 from mcp.types import (
     CallToolResult,
@@ -19,131 +30,392 @@ from mcp.types import (
 )
 
 
+# Default example values of primitive schema types without an example
+_DEFAULT_EXAMPLES = {'string': "example_string", 'integer': 0, 'number': 0.0, 'boolean': False}
+
+# Markers of the explicit work stacks of the schema formatter and example generator
+_PENDING = object()
+_FORMAT = object()
+_END_OBJECT = object()
+
+# Bump when the layout of the cached index changes, so caches written by older versions are rebuilt
+INDEX_CACHE_VERSION = 6
+
+# HTTP methods of the indexed operations, by their (lowercase) key in an OpenAPI path item
+_METHOD_MAP = {'get': 'GET', 'post': 'POST', 'put': 'PUT', 'delete': 'DELETE', 'patch': 'PATCH'}
+
+# Keys of parameters and schema properties whose (categorical) string values repeat throughout the spec
+_INTERN_KEYS = ('in', 'name', 'type', 'format')
+
+# Number of distinct keywords whose matching endpoints are remembered between queries
+KEYWORD_CACHE_SIZE = 1024
+
+# Number of (query, limit) searches whose results are remembered between queries
+SEARCH_CACHE_SIZE = 256
+
+
+def _byte_mask(blob: bytes) -> int:
+    """Get a 64 bit mask of the bytes occurring in a text: a text can only contain a pattern that its mask covers."""
+    mask = 0
+    for byte in set(blob):
+        mask |= 1 << (byte & 63)
+    return mask
+
+
+def _preview(text: str, length: int) -> str:
+    """Truncate a text to a preview of at most length characters, marking truncation with an ellipsis."""
+    return text[:length] + ('...' if len(text) > length else '')
+
+
 class ThingsBoardAPIDocs:
+    # Attributes built from the specification that are persisted in the index cache
+    _CACHED_ATTRIBUTES = ('spec', 'endpoints', 'tags', 'schemas', '_searchable_cache', '_searchable_masks', '_relevance_blobs', '_postings', '_endpoint_position', '_tag_to_endpoints')
+    # All attributes that are only available once the index is loaded
+    _INDEX_ATTRIBUTES = frozenset(_CACHED_ATTRIBUTES + ('_vocabulary_words', '_vocabulary', '_vocabulary_ends', '_api_info'))
+    
     def __init__(self, openapi_spec_path: str = "openapi-spec.json"):
         """Initialize with the OpenAPI specification file."""
         self.spec_path = Path(openapi_spec_path)
-        self.spec = self._load_openapi_spec()
-        self._build_search_index()
+        # The parsed spec and search index are cached next to the spec, so only the first start pays for building them
+        self.cache_path = self.spec_path.with_suffix('.cache.pkl')
+        # The index is loaded on first use instead of here, so the server starts without waiting for it
+        self._index_loaded = False
+        self._index_lock = threading.Lock()
+        # Formatted schemas and generated examples, keyed by the identity of the (shared, resolved) schema object
+        self._format_cache = {}
+        self._example_cache = {}
+        # Keywords repeat across queries, so the endpoints matching each keyword are memoized
+        self._keyword_endpoints = {}
+        # Clients often repeat the same search within a session; least recently used results are evicted first
+        self._search_cache = OrderedDict()
+    
+    def __getattr__(self, name: str) -> Any:
+        """Load the index on first access to any of its attributes."""
+        # Only called for attributes that are not set, i.e. the index attributes until the index is loaded
+        if name in self._INDEX_ATTRIBUTES and not self._index_loaded:
+            self._load_index()
+            return getattr(self, name)
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{name}'")
+    
+    def _load_index(self):
+        """Load the spec and search index from the cache, or build them from the specification."""
+        with self._index_lock:
+            if self._index_loaded:
+                return  # Loaded by another thread while waiting for the lock
+            if not self._load_index_cache():
+                self.spec = self._load_openapi_spec()
+                self._build_search_index()
+                self._save_index_cache()
+            self._build_result_entries()
+            self._build_vocabulary()
+            self._build_api_info()
+            self._freeze_index()
+            self._index_loaded = True
     
     def _load_openapi_spec(self) -> Dict[str, Any]:
         """Load the OpenAPI specification from file with resolved references."""
         if not self.spec_path.exists():
             raise FileNotFoundError(f"OpenAPI specification not found: {self.spec_path}")
         
-        with open(self.spec_path, 'r', encoding='utf-8') as f:
-            spec = json.load(f)
+        spec = orjson.loads(self.spec_path.read_bytes())
         
-        # Resolve all $ref references using jsonref
-        full_spec = jsonref.replace_refs(spec)
+        # Resolve $ref references lazily using jsonref: every reference becomes a proxy that loads its target
+        # on first access, and all references to the same target share that one (unresolved until used) object
+        full_spec = jsonref.replace_refs(spec, proxies=True, lazy_load=True)
         return full_spec
     
+    def _resolve(self, schema: Any) -> Any:
+        """Unwrap a jsonref proxy into the shared object it refers to."""
+        # The proxy caches its target, so this resolves each reference at most once; callers then work
+        # on (and can key caches by) the target object instead of the proxy of one particular reference
+        if isinstance(schema, jsonref.JsonRef):
+            return schema.__subject__
+        return schema
+    
+    def _get_spec_fingerprint(self) -> tuple:
+        """Identify the current version of the specification file."""
+        stat = self.spec_path.stat()
+        return (INDEX_CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+    
+    def _load_index_cache(self) -> bool:
+        """Load the spec and search index from the cache, if it was built from the current specification file."""
+        try:
+            # Unpickle straight from a read-only mapping of the file: no buffered copy of the cache is made, and
+            # every server process started from the same cache reads the same pages of the OS page cache
+            with open(self.cache_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                fingerprint, state = pickle.loads(mapped)
+            if fingerprint != self._get_spec_fingerprint():
+                return False
+        except Exception:
+            # Missing, unreadable or stale cache: rebuild from the specification
+            return False
+        
+        for name, value in zip(self._CACHED_ATTRIBUTES, state):
+            setattr(self, name, value)
+        return True
+    
+    def _save_index_cache(self):
+        """Persist the spec and search index (best effort, the cache is only an optimization)."""
+        try:
+            state = tuple(getattr(self, name) for name in self._CACHED_ATTRIBUTES)
+            data = pickle.dumps((self._get_spec_fingerprint(), state), protocol=pickle.HIGHEST_PROTOCOL)
+            with tempfile.NamedTemporaryFile(dir=self.cache_path.parent, suffix='.tmp', delete=False) as f:
+                f.write(data)
+            os.replace(f.name, self.cache_path)  # Atomic, so a concurrent start never reads a partial cache
+        except (OSError, pickle.PicklingError, RecursionError, TypeError):
+            pass
+    
     def _build_search_index(self):
         """Build a search index for quick lookups."""
-        self.endpoints = {}
-        self.tags = {}
-        self.schemas = {}
-        
-        # Index endpoints
-        for path, methods in self.spec.get('paths', {}).items():
-            for method, details in methods.items():
-                if method.upper() in ['GET', 'POST', 'PUT', 'DELETE', 'PATCH']:
-                    endpoint_key = f"{method.upper()} {path}"
-                    self.endpoints[endpoint_key] = {
-                        'path': path,
-                        'method': method.upper(),
-                        'details': details
-                    }
-        
-        # Index tags
-        for tag in self.spec.get('tags', []):
-            self.tags[tag['name']] = tag
-        
-        # Index schemas
-        for schema_name, schema in self.spec.get('components', {}).get('schemas', {}).items():
-            self.schemas[schema_name] = schema
-        
-
+        # Index endpoints, tags and schemas, each built in a single comprehension
+        self.endpoints = {
+            f"{http_method} {path}": {
+                'path': path,
+                'method': http_method,
+                'details': details
+            }
+            for path, methods in self.spec.get('paths', {}).items()
+            for method, details in methods.items()
+            if (http_method := _METHOD_MAP.get(method) or _METHOD_MAP.get(method.lower())) is not None
+        }
+        self.tags = {tag['name']: tag for tag in self.spec.get('tags', [])}
+        self.schemas = dict(self.spec.get('components', {}).get('schemas', {}))
+        
+        self._intern_strings()
+        
+        # Index the searchable text (summary, description, operationId and tags) of every endpoint once:
+        # the case-folded text per endpoint, and an inverted index from each word to the endpoints containing it.
+        # Texts are stored as UTF-8 bytes, for which substring tests are cheaper than for str.
+        # Bound to locals, as they are filled for every endpoint
+        searchable_cache = self._searchable_cache = {}
+        searchable_masks = self._searchable_masks = {}
+        relevance_blobs = self._relevance_blobs = {}
+        postings = self._postings = {}
+        endpoint_position = self._endpoint_position = {}
+        tag_to_endpoints = self._tag_to_endpoints = {}
+        for position, (endpoint_key, endpoint_data) in enumerate(self.endpoints.items()):
+            details = endpoint_data['details']
+            summary = details.get('summary', '')
+            description = details.get('description', '')
+            tags = details.get('tags', [])
+            searchable_text = ' '.join([
+                summary,
+                description,
+                details.get('operationId', ''),
+                ' '.join(tags)
+            ]).casefold()
+            search_blob = searchable_text.encode('utf-8', 'ignore')
+            searchable_cache[endpoint_key] = search_blob
+            searchable_masks[endpoint_key] = _byte_mask(search_blob)
+            # Summary and description separately (with their masks, to skip substring tests that can not match), to rank the matches
+            summary_blob = summary.casefold().encode('utf-8', 'ignore')
+            desc_blob = description.casefold().encode('utf-8', 'ignore')
+            relevance_blobs[endpoint_key] = (summary_blob, _byte_mask(summary_blob), desc_blob, _byte_mask(desc_blob))
+            endpoint_position[endpoint_key] = position
+
+            for word in set(searchable_text.split()):
+                postings.setdefault(word, set()).add(endpoint_key)
+            for tag in dict.fromkeys(tags):
+                tag_to_endpoints.setdefault(tag, []).append(endpoint_key)
+        
+        # Immutable from here on, so the index can be shared by concurrent tool calls without copying
+        for word, endpoint_keys in postings.items():
+            postings[word] = frozenset(endpoint_keys)
+        for tag, endpoint_keys in tag_to_endpoints.items():
+            tag_to_endpoints[tag] = tuple(endpoint_keys)
+    
+    def _intern_strings(self):
+        """Intern the categorical strings repeated across endpoints and schemas, so all repetitions share one object."""
+        # The shared objects are also pickled only once, so the deduplication carries over to the index cache.
+        # Referenced objects (proxies) are left alone, so this does not resolve any reference.
+        def intern_values(obj):
+            if type(obj) is dict:
+                for key in _INTERN_KEYS:
+                    value = obj.get(key)
+                    if type(value) is str:
+                        obj[key] = sys.intern(value)
+        
+        for endpoint_data in self.endpoints.values():
+            details = endpoint_data['details']
+            if 'tags' in details:
+                details['tags'] = [sys.intern(tag) for tag in details['tags']]
+            for parameter in details.get('parameters', []):
+                intern_values(parameter)
+                intern_values(parameter.get('schema') if type(parameter) is dict else None)
+        for schema in self.schemas.values():
+            if type(schema) is dict:
+                intern_values(schema)
+                for prop in schema.get('properties', {}).values():
+                    intern_values(prop)
+    
+    def _build_result_entries(self):
+        """Build the search and tag result entries of every endpoint."""
+        # The spec is immutable, so the (read-only) result entries are built once and shared by all queries
+        for endpoint_key, endpoint_data in self.endpoints.items():
+            details = endpoint_data['details']
+            endpoint_data['formatted'] = MappingProxyType({
+                'endpoint': endpoint_key,
+                'path': endpoint_data['path'],
+                'method': endpoint_data['method'],
+                'summary': details.get('summary', ''),
+                'description': details.get('description', ''),
+                'tags': details.get('tags', []),
+                'operationId': details.get('operationId', ''),
+                'parameters': details.get('parameters', []),
+                'requestBody': details.get('requestBody', {}),
+                'responses': details.get('responses', {}),
+                # Unique content types of the success (2xx) responses, in order of appearance
+                'success_content_types': list(dict.fromkeys(
+                    content_type
+                    for status_code, response in details.get('responses', {}).items()
+                    if status_code.startswith('2')
+                    for content_type in response.get('content', {})
+                )),
+                # Description as shown in search results
+                'description_preview': _preview(details.get('description', ''), 200)
+            })
+            endpoint_data['formatted_short'] = MappingProxyType({
+                'endpoint': endpoint_key,
+                'path': endpoint_data['path'],
+                'method': endpoint_data['method'],
+                'summary': details.get('summary', ''),
+                'description': details.get('description', ''),
+                'operationId': details.get('operationId', ''),
+                # Description as shown in tag listings
+                'description_preview': _preview(details.get('description', ''), 150)
+            })
+    
+    def _freeze_index(self):
+        """Expose the built index through read-only views: after initialization, nothing may mutate it."""
+        # Concurrent tool calls (e.g. on a free-threaded build) then only ever read the shared index;
+        # the memoization caches are the only state that is still written at query time
+        self.endpoints = MappingProxyType(self.endpoints)
+        self.tags = MappingProxyType(self.tags)
+        self.schemas = MappingProxyType(self.schemas)
+        self._postings = MappingProxyType(self._postings)
+        self._tag_to_endpoints = MappingProxyType(self._tag_to_endpoints)
+    
+    def _build_api_info(self):
+        """Build the general API information once, as neither the spec nor the index change after loading."""
+        info = self.spec.get('info', {})
+        self._api_info = {
+            'title': info.get('title', ''),
+            'description': info.get('description', ''),
+            'version': info.get('version', ''),
+            'servers': self.spec.get('servers', []),
+            'total_endpoints': len(self.endpoints),
+            'total_tags': len(self.tags),
+            'total_schemas': len(self.schemas)
+        }
+    
+    def _build_vocabulary(self):
+        """Join the distinct words of the index into one text, so all keywords of a query can be matched in a single scan."""
+        self._vocabulary_words = list(self._postings)
+        # Words never contain whitespace, so a keyword match can not span the separator
+        self._vocabulary = '\n'.join(self._vocabulary_words)
+        # Offset of the separator following each word, to map the position of a match back to its word
+        self._vocabulary_ends = []
+        offset = -1
+        for word in self._vocabulary_words:
+            offset += len(word) + 1
+            self._vocabulary_ends.append(offset)
+    
+    def _find_keyword_endpoints(self, keywords: List[str]) -> Dict[str, frozenset]:
+        """Get the endpoints whose searchable text contains each of the (whitespace free) keywords."""
+        # A keyword without whitespace is a substring of the text if and only if it is a substring of one of its words,
+        # so one Aho-Corasick pass over the distinct words finds the matching words of every keyword at once
+        automaton = ahocorasick.Automaton()
+        for keyword in keywords:
+            automaton.add_word(keyword, keyword)
+        automaton.make_automaton()
+        
+        matched_words = {keyword: set() for keyword in keywords}
+        for end_index, keyword in automaton.iter(self._vocabulary):
+            matched_words[keyword].add(bisect_right(self._vocabulary_ends, end_index))
+        
+        keyword_endpoints = {}
+        for keyword, word_indexes in matched_words.items():
+            endpoint_keys = set()
+            for word_index in word_indexes:
+                endpoint_keys |= self._postings[self._vocabulary_words[word_index]]
+            keyword_endpoints[keyword] = frozenset(endpoint_keys)
+        return keyword_endpoints
+    
+    def _match_keywords(self, keywords: List[str]) -> List[frozenset]:
+        """Get the endpoints matching each keyword, scanning the index only for keywords not seen before."""
+        missing = [keyword for keyword in dict.fromkeys(keywords) if keyword not in self._keyword_endpoints]
+        if missing:
+            if len(self._keyword_endpoints) + len(missing) > KEYWORD_CACHE_SIZE:
+                self._keyword_endpoints.clear()
+            self._keyword_endpoints.update(self._find_keyword_endpoints(missing))
+        return [self._keyword_endpoints[keyword] for keyword in keywords]
+    
     
     def search_endpoints(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
         """Search for endpoints based on query."""
-        query_lower = query.lower()
+        # Results only depend on the case-folded query, and the (read-only) entries are shared anyway
+        cache_key = (query.casefold(), limit)
+        results = self._search_cache.get(cache_key)
+        if results is None:
+            results = self._rank_endpoints(*cache_key)
+            self._search_cache[cache_key] = results
+            if len(self._search_cache) > SEARCH_CACHE_SIZE:
+                self._search_cache.popitem(last=False)
+        else:
+            self._search_cache.move_to_end(cache_key)
+        return list(results)
+    
+    def _rank_endpoints(self, query_folded: str, limit: int) -> List[Dict[str, Any]]:
+        """Find and rank the endpoints matching a case-folded query."""
+        query_blob = query_folded.encode('utf-8', 'ignore')
         # Split query into individual keywords
-        keywords = [kw.strip() for kw in query_lower.split() if kw.strip()]
-        results = []
+        keywords = [kw.strip() for kw in query_folded.split() if kw.strip()]
+        keyword_blobs = [(blob, _byte_mask(blob)) for blob in (keyword.encode('utf-8', 'ignore') for keyword in keywords)]
+        query_mask = _byte_mask(query_blob)
         
-        for endpoint_key, endpoint_data in self.endpoints.items():
-            details = endpoint_data['details']
-            
-            # Search in summary, description, tags, and operationId
-            searchable_text = [
-                details.get('summary', ''),
-                details.get('description', ''),
-                details.get('operationId', ''),
-                ' '.join(details.get('tags', []))
+        if keywords:
+            # Count how many keywords match each endpoint, looked up in the inverted index
+            keyword_matches = Counter()
+            for endpoint_keys in self._match_keywords(keywords):
+                keyword_matches.update(endpoint_keys)
+            matched_endpoints = sorted(keyword_matches, key=self._endpoint_position.__getitem__)
+        else:
+            # If no keywords, fall back to exact substring match
+            searchable_masks = self._searchable_masks
+            matched_endpoints = [
+                endpoint_key for endpoint_key, search_blob in self._searchable_cache.items()
+                if searchable_masks[endpoint_key] & query_mask == query_mask and query_blob in search_blob
             ]
-            
-            searchable_text = ' '.join(searchable_text).lower()
-            
-            # Check if at least one keyword is present in the searchable text
-            if keywords:
-                # Count how many keywords match
-                keyword_matches = sum(1 for keyword in keywords if keyword in searchable_text)
-                if keyword_matches > 0:
-                    results.append({
-                        'endpoint': endpoint_key,
-                        'path': endpoint_data['path'],
-                        'method': endpoint_data['method'],
-                        'summary': details.get('summary', ''),
-                        'description': details.get('description', ''),
-                        'tags': details.get('tags', []),
-                        'operationId': details.get('operationId', ''),
-                        'parameters': details.get('parameters', []),
-                        'requestBody': details.get('requestBody', {}),
-                        'responses': details.get('responses', {}),
-                        'keyword_matches': keyword_matches  # Store match count for sorting
-                    })
-            else:
-                # If no keywords, fall back to exact substring match
-                if query_lower in searchable_text:
-                    results.append({
-                        'endpoint': endpoint_key,
-                        'path': endpoint_data['path'],
-                        'method': endpoint_data['method'],
-                        'summary': details.get('summary', ''),
-                        'description': details.get('description', ''),
-                        'tags': details.get('tags', []),
-                        'operationId': details.get('operationId', ''),
-                        'parameters': details.get('parameters', []),
-                        'requestBody': details.get('requestBody', {}),
-                        'responses': details.get('responses', {}),
-                        'keyword_matches': 1  # Single match for exact substring
-                    })
         
         # Sort by relevance (endpoints matching more keywords first, then by position in summary/description)
-        def relevance_score(result):
-            summary_lower = result['summary'].lower()
-            desc_lower = result['description'].lower()
+        def relevance_score(endpoint_key):
+            summary_blob, summary_mask, desc_blob, desc_mask = self._relevance_blobs[endpoint_key]
             
             # Count how many keywords match in summary and description
-            summary_matches = sum(1 for keyword in keywords if keyword in summary_lower)
-            desc_matches = sum(1 for keyword in keywords if keyword in desc_lower)
+            summary_matches = sum(1 for keyword, mask in keyword_blobs if summary_mask & mask == mask and keyword in summary_blob)
+            desc_matches = sum(1 for keyword, mask in keyword_blobs if desc_mask & mask == mask and keyword in desc_blob)
             
             # Primary sort: total keyword matches (descending)
             # Secondary sort: matches in summary (descending)
             # Tertiary sort: matches in description (descending)
-            return (-result['keyword_matches'], -summary_matches, -desc_matches)
+            return (-keyword_matches[endpoint_key], -summary_matches, -desc_matches)
         
         if keywords:
-            results.sort(key=relevance_score)
+            sort_key = relevance_score
         else:
             # Fall back to original sorting for exact substring matches
-            results.sort(key=lambda x: (
-                query_lower not in x['summary'].lower(),
-                query_lower not in x['description'].lower()
-            ))
+            sort_key = lambda endpoint_key: (
+                query_blob not in self._relevance_blobs[endpoint_key][0],
+                query_blob not in self._relevance_blobs[endpoint_key][2]
+            )
         
-        return results[:limit]
+        # Rank the endpoint keys and only look up the result entries of the top ones; nsmallest is stable
+        # like sorted(), but (unlike slicing) does not support a limit counted from the end
+        if limit > 0:
+            top_endpoints = heapq.nsmallest(limit, matched_endpoints, key=sort_key)
+        else:
+            top_endpoints = sorted(matched_endpoints, key=sort_key)[:limit]
+        return [self.endpoints[endpoint_key]['formatted'] for endpoint_key in top_endpoints]
     
     def get_endpoint_details(self, path: str, method: str = 'GET') -> Optional[Dict[str, Any]]:
         """Get detailed information about a specific endpoint."""
@@ -154,18 +426,7 @@ class ThingsBoardAPIDocs:
     
     def get_tag_endpoints(self, tag_name: str) -> List[Dict[str, Any]]:
         """Get all endpoints for a specific tag."""
-        results = []
-        for endpoint_key, endpoint_data in self.endpoints.items():
-            if tag_name in endpoint_data['details'].get('tags', []):
-                results.append({
-                    'endpoint': endpoint_key,
-                    'path': endpoint_data['path'],
-                    'method': endpoint_data['method'],
-                    'summary': endpoint_data['details'].get('summary', ''),
-                    'description': endpoint_data['details'].get('description', ''),
-                    'operationId': endpoint_data['details'].get('operationId', '')
-                })
-        return results
+        return [self.endpoints[endpoint_key]['formatted_short'] for endpoint_key in self._tag_to_endpoints.get(tag_name, ())]
     
     def get_schema_info(self, schema_name: str) -> Optional[Dict[str, Any]]:
         """Get information about a specific schema."""
@@ -177,15 +438,7 @@ class ThingsBoardAPIDocs:
     
     def get_api_info(self) -> Dict[str, Any]:
         """Get general API information."""
-        return {
-            'title': self.spec.get('info', {}).get('title', ''),
-            'description': self.spec.get('info', {}).get('description', ''),
-            'version': self.spec.get('info', {}).get('version', ''),
-            'servers': self.spec.get('servers', []),
-            'total_endpoints': len(self.endpoints),
-            'total_tags': len(self.tags),
-            'total_schemas': len(self.schemas)
-        }
+        return self._api_info
     
 
     
@@ -231,110 +484,161 @@ class ThingsBoardAPIDocs:
     
     def _generate_example_from_schema(self, schema: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Generate an example response from schema definition."""
-        if not schema:
-            return None
-        
-        schema_type = schema.get('type', 'object')
-        
-        if schema_type == 'object':
-            properties = schema.get('properties', {})
-            if not properties:
-                return {}
+        schema = self._resolve(schema)
+        cached = self._example_cache.get(id(schema))
+        # The cache entry holds on to the schema, so its id cannot be reused by another object
+        if cached is not None and cached[0] is schema:
+            return cached[1]
+        
+        # Depth-first over an explicit stack of the object/array examples under construction instead of recursion.
+        # A frame is [example, properties iterator (None for an array), ancestor schema ids, current property name].
+        stack = []
+        value = self._start_example(schema, frozenset(), stack)
+        
+        while stack:
+            frame = stack[-1]
+            example, properties, ancestors, prop_name = frame
             
-            example = {}
-            for prop_name, prop_schema in properties.items():
-                prop_example = self._generate_example_from_schema(prop_schema)
-                if prop_example is not None:
-                    example[prop_name] = prop_example
+            if properties is None:
+                # The example of the array items is complete
+                stack.pop()
+                value = [value] if value is not None else []
+                continue
             
-            return example if example else None
-        
-        elif schema_type == 'array':
-            items = schema.get('items', {})
-            item_example = self._generate_example_from_schema(items)
-            if item_example is not None:
-                return [item_example]
-            return []
+            if value is not _PENDING and value is not None:
+                example[prop_name] = value
+            
+            next_property = next(properties, None)
+            if next_property is None:
+                stack.pop()
+                value = example if example else None
+                continue
+            
+            frame[3], prop_schema = next_property
+            value = self._start_example(prop_schema, ancestors, stack)
         
-        else:
-            # For primitive types, use the example if available
-            if 'example' in schema:
-                return schema['example']
+        self._example_cache[id(schema)] = (schema, value)
+        return value
+    
+    def _start_example(self, schema: Dict[str, Any], ancestors: frozenset, stack: list) -> Any:
+        """Generate the example of a primitive schema, or push the frame(s) of an object/array schema onto the stack."""
+        while True:
+            schema = self._resolve(schema)
+            # A recursive schema (e.g. a tree node referencing itself) ends the example where it repeats
+            if not schema or id(schema) in ancestors:
+                return None
+            ancestors = ancestors | {id(schema)}
+            
+            schema_type = schema.get('type', 'object')
+            
+            if schema_type == 'object':
+                properties = schema.get('properties', {})
+                if not properties:
+                    return {}
+                stack.append([{}, iter(properties.items()), ancestors, None])
+                return _PENDING
+            
+            elif schema_type == 'array':
+                # Continue with the items, which the array frame wraps into a list once complete
+                stack.append([None, None, ancestors, None])
+                schema = schema.get('items', {})
+            
             else:
+                # For primitive types, use the example if available
+                if 'example' in schema:
+                    return schema['example']
                 # Generate default examples for common types
-                if schema_type == 'string':
-                    return "example_string"
-                elif schema_type == 'integer':
-                    return 0
-                elif schema_type == 'number':
-                    return 0.0
-                elif schema_type == 'boolean':
-                    return False
-                else:
-                    return None
+                return _DEFAULT_EXAMPLES.get(schema_type) if isinstance(schema_type, str) else None
     
     def _format_schema(self, schema: Dict[str, Any], indent: int = 0, max_depth: int = 3) -> str:
         """Format a schema for display with full details using resolved references."""
-        if not schema:
-            return "N/A"
-        
-        # Prevent infinite recursion
-        if indent > max_depth:
-            return "... (max depth reached)"
-        
-        schema_type = schema.get('type', 'object')
-        description = schema.get('description', '')
-        
-        # Handle different schema types
-        if schema_type == 'object':
-            properties = schema.get('properties', {})
-            required = schema.get('required', [])
+        schema = self._resolve(schema)
+        cache_key = (id(schema), indent, max_depth)
+        cached = self._format_cache.get(cache_key)
+        # The cache entry holds on to the schema, so its id cannot be reused by another object
+        if cached is not None and cached[0] is schema:
+            return cached[1]
+        root_schema = schema
+        
+        # Iterative instead of recursive: a LIFO stack holds the fragments still to be emitted, the nested
+        # schemas still to be formatted and the end markers of objects; the output is joined once at the end
+        parts = []
+        stack = [(_FORMAT, schema, indent)]
+        
+        while stack:
+            item = stack.pop()
+            if isinstance(item, str):
+                parts.append(item)
+                continue
+            
+            if item[0] is _END_OBJECT:
+                # An object ends without trailing whitespace (after its last property line)
+                start = item[1]
+                parts[start:] = [''.join(parts[start:]).rstrip()]
+                continue
+            
+            _, schema, indent = item
+            schema = self._resolve(schema)
+            if not schema:
+                parts.append("N/A")
+                continue
+            
+            # Prevent infinite recursion
+            if indent > max_depth:
+                parts.append("... (max depth reached)")
+                continue
             
-            if not properties:
-                return f"object{': ' + description if description else ''}"
+            schema_type = schema.get('type', 'object')
+            description = schema.get('description', '')
             
-            formatted = f"object{': ' + description if description else ''}\n"
-            for prop_name, prop_schema in properties.items():
-                is_required = prop_name in required
-                prop_desc = prop_schema.get('description', '')
+            # Handle different schema types
+            if schema_type == 'object':
+                properties = schema.get('properties', {})
+                required = schema.get('required', [])
                 
-                # Get the property type
-                prop_type = self._get_schema_type(prop_schema)
+                if not properties:
+                    parts.append(f"object{': ' + description if description else ''}")
+                    continue
                 
-                # If it's an object with properties or array, include its details
-                if prop_schema.get('type') == 'object' and 'properties' in prop_schema:
-                    prop_details = self._format_schema(prop_schema, indent + 1, max_depth)
-                    if prop_details and prop_details != "N/A":
-                        prop_type += f"\n{'  ' * (indent + 2)}{prop_details}"
-                elif prop_schema.get('type') == 'array':
-                    prop_details = self._format_schema(prop_schema, indent + 1, max_depth)
-                    if prop_details and prop_details != "N/A":
-                        prop_type += f"\n{'  ' * (indent + 2)}{prop_details}"
+                work = [f"object{': ' + description if description else ''}\n"]
+                for prop_name, prop_schema in properties.items():
+                    is_required = prop_name in required
+                    prop_desc = prop_schema.get('description', '')
+                    
+                    # Get the property type
+                    work.append(f"{'  ' * (indent + 1)}• {prop_name} ({self._get_schema_type(prop_schema)}")
+                    
+                    # If it's an object with properties or array, include its details
+                    if (prop_schema.get('type') == 'object' and 'properties' in prop_schema) or prop_schema.get('type') == 'array':
+                        work.append(f"\n{'  ' * (indent + 2)}")
+                        work.append((_FORMAT, prop_schema, indent + 1))
+                    
+                    work.append(f"){' *' if is_required else ''}{': ' + prop_desc if prop_desc else ''}\n")
                 
-                formatted += f"{'  ' * (indent + 1)}• {prop_name} ({prop_type}){' *' if is_required else ''}{': ' + prop_desc if prop_desc else ''}\n"
+                stack.append((_END_OBJECT, len(parts)))
+                stack.extend(reversed(work))
             
-            return formatted.rstrip()
-        
-        elif schema_type == 'array':
-            items = schema.get('items', {})
-            item_type = self._get_schema_type(items)
+            elif schema_type == 'array':
+                items = schema.get('items', {})
+                item_type = self._get_schema_type(items)
+                parts.append(f"array of {item_type}{': ' + description if description else ''}")
+                
+                # If the array items are objects with properties, include their details
+                # Handle both explicit 'object' type and resolved objects with properties but no type
+                if ((items.get('type') == 'object' or (items.get('type') is None and 'properties' in items)) and 'properties' in items) or items.get('type') == 'array':
+                    parts.append(f"\n{'  ' * (indent + 1)}")
+                    stack.append((_FORMAT, items, indent + 1))
             
-            # If the array items are objects with properties, include their details
-            # Handle both explicit 'object' type and resolved objects with properties but no type
-            if (items.get('type') == 'object' or (items.get('type') is None and 'properties' in items)) and 'properties' in items:
-                item_details = self._format_schema(items, indent + 1, max_depth)
-                return f"array of {item_type}{': ' + description if description else ''}\n{'  ' * (indent + 1)}{item_details}"
-            elif items.get('type') == 'array':
-                item_details = self._format_schema(items, indent + 1, max_depth)
-                return f"array of {item_type}{': ' + description if description else ''}\n{'  ' * (indent + 1)}{item_details}"
             else:
-                return f"array of {item_type}{': ' + description if description else ''}"
+                parts.append(f"{schema_type}{': ' + description if description else ''}")
         
-        else:
-            return f"{schema_type}{': ' + description if description else ''}"
+        formatted = ''.join(parts)
+        self._format_cache[cache_key] = (root_schema, formatted)
+        return formatted
     
     def _get_schema_type(self, schema: Dict[str, Any]) -> str:
         """Get the type of a schema."""
+        schema = self._resolve(schema)
         if not schema:
             return "unknown"
         
@@ -356,13 +660,23 @@ class ThingsBoardAPIDocs:
         else:
             return schema_type
     
+    def _json_default(self, obj: Any) -> Any:
+        """Serialize types orjson does not handle natively: jsonref proxies as their target, anything else as string."""
+        if isinstance(obj, jsonref.JsonRef):
+            return obj.__subject__
+        return str(obj)
+    
+    def _json_dumps(self, obj: Any) -> str:
+        """Serialize an object to indented JSON."""
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS, default=self._json_default).decode()
+    
     def _safe_json_serialize(self, obj: Any, max_depth: int = 3, current_depth: int = 0) -> str:
         """Safely serialize an object to JSON, handling non-serializable types."""
         if current_depth > max_depth:
             return "... (max depth reached)"
         
         try:
-            return json.dumps(obj, indent=2, default=str)
+            return self._json_dumps(obj)
         except (TypeError, ValueError):
             # If direct serialization fails, try to extract key information
             if isinstance(obj, dict):
@@ -376,15 +690,20 @@ class ThingsBoardAPIDocs:
                         simplified[key] = [self._safe_json_serialize(item, max_depth, current_depth + 1) if isinstance(item, dict) else str(item) for item in value[:3]]  # Limit list items
                     else:
                         simplified[key] = str(value)
-                return json.dumps(simplified, indent=2)
+                return self._json_dumps(simplified)
             elif isinstance(obj, list):
                 simplified = [self._safe_json_serialize(item, max_depth, current_depth + 1) if isinstance(item, dict) else str(item) for item in obj[:3]]  # Limit list items
-                return json.dumps(simplified, indent=2)
+                return self._json_dumps(simplified)
             else:
                 return str(obj)
 
 
-# Initialize the API docs handler
+def _text_result(text: str) -> CallToolResult:
+    """Wrap a text response in a tool result, skipping Pydantic validation of the (always valid) models."""
+    return CallToolResult.model_construct(content=[TextContent.model_construct(type="text", text=text)])
+
+
+# Initialize the API docs handler (the index itself is loaded by the first tool call)
 api_docs = ThingsBoardAPIDocs()
 
 # Create MCP server
@@ -407,57 +726,30 @@ def search_api_endpoints(query: str, limit: int = 10) -> CallToolResult:
         results = api_docs.search_endpoints(query, limit)
         
         if not results:
-            return CallToolResult(
-                content=[
-                    TextContent(
-                        type="text",
-                        text=f"No endpoints found matching '{query}'"
-                    )
-                ]
-            )
+            return _text_result(f"No endpoints found matching '{query}'")
         
         # Format results
         formatted_results = []
         for result in results:
-            # Get response type information
-            response_types = []
-            for status_code, response in result.get('responses', {}).items():
-                if status_code.startswith('2'):  # Success responses
-                    if 'content' in response:
-                        for content_type in response['content'].keys():
-                            if content_type not in response_types:
-                                response_types.append(content_type)
+            # Get response type information (precomputed per endpoint)
+            response_types = result.get('success_content_types', [])
             
             response_info = f" - **Response**: {', '.join(response_types)}" if response_types else ""
             
             formatted_result = f"""
 **{result['endpoint']}**
 - **Summary**: {result['summary']}
-- **Description**: {result['description'][:200]}{'...' if len(result['description']) > 200 else ''}
+- **Description**: {result['description_preview']}
 - **Tags**: {', '.join(result['tags'])}
 - **Operation ID**: {result['operationId']}{response_info}
 """
             formatted_results.append(formatted_result)
         
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=f"Found {len(results)} endpoints matching '{query}':\n\n" + 
-                         "\n".join(formatted_results)
-                )
-            ]
-        )
+        return _text_result(f"Found {len(results)} endpoints matching '{query}':\n\n" +
+                            "\n".join(formatted_results))
     
     except Exception as e:
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=f"Error searching endpoints: {str(e)}"
-                )
-            ]
-        )
+        return _text_result(f"Error searching endpoints: {str(e)}")
 
 
 
@@ -476,22 +768,15 @@ def get_endpoint_details(path: str, method: str = "GET") -> CallToolResult:
         Detailed information about the endpoint including parameters, request body, and responses
     """
     try:
-        details = api_docs.get_endpoint_details(path, method)
+        details = api_docs.endpoints.get(f"{method.upper()} {path}")
         
         if not details:
-            return CallToolResult(
-                content=[
-                    TextContent(
-                        type="text",
-                        text=f"Endpoint not found: {method.upper()} {path}"
-                    )
-                ]
-            )
+            return _text_result(f"Endpoint not found: {method.upper()} {path}")
         
         endpoint_data = details['details']
         
         # Format detailed information
-        result_text = f"""
+        parts = [f"""
 **{method.upper()} {path}**
 
 **Summary**: {endpoint_data.get('summary', 'N/A')}
@@ -502,24 +787,24 @@ def get_endpoint_details(path: str, method: str = "GET") -> CallToolResult:
 
 **Tags**: {', '.join(endpoint_data.get('tags', []))}
 
-**Parameters**:"""
+**Parameters**:"""]
         
         for param in endpoint_data.get('parameters', []):
-            result_text += f"""
-- {param.get('name', 'N/A')} ({param.get('in', 'N/A')}) - {param.get('description', 'N/A')} - Required: {param.get('required', False)}"""
+            parts.append(f"""
+- {param.get('name', 'N/A')} ({param.get('in', 'N/A')}) - {param.get('description', 'N/A')} - Required: {param.get('required', False)}""")
         
         if endpoint_data.get('requestBody'):
-            result_text += f"""
+            parts.append(f"""
 
-**Request Body**: {api_docs._safe_json_serialize(endpoint_data['requestBody'])}"""
+**Request Body**: {api_docs._safe_json_serialize(endpoint_data['requestBody'])}""")
         
-        result_text += f"""
+        parts.append(f"""
 
-**Responses**:"""
+**Responses**:""")
         
         for status_code, response in endpoint_data.get('responses', {}).items():
-            result_text += f"""
-- {status_code}: {response.get('description', 'N/A')}"""
+            parts.append(f"""
+- {status_code}: {response.get('description', 'N/A')}""")
             
             # Add response schema and examples information
             if 'content' in response:
@@ -528,8 +813,8 @@ def get_endpoint_details(path: str, method: str = "GET") -> CallToolResult:
                     if status_code == "200" and 'schema' in content_details:
                         schema = content_details['schema']
                         formatted_schema = api_docs._format_schema(schema)
-                        result_text += f"""
-  **Response Schema ({content_type})**: {formatted_schema}"""
+                        parts.append(f"""
+  **Response Schema ({content_type})**: {formatted_schema}""")
                     
                     # Add examples information only for 200 OK responses
                     if status_code == "200":
@@ -537,38 +822,24 @@ def get_endpoint_details(path: str, method: str = "GET") -> CallToolResult:
                         if content_type in examples_info:
                             example_data = examples_info[content_type]
                             if example_data['type'] == 'direct':
-                                result_text += f"""
-  **Response Example ({content_type})**: {api_docs._safe_json_serialize(example_data['value'])}"""
+                                parts.append(f"""
+  **Response Example ({content_type})**: {api_docs._safe_json_serialize(example_data['value'])}""")
                             elif example_data['type'] == 'named':
-                                result_text += f"""
-  **Response Examples ({content_type})**:"""
+                                parts.append(f"""
+  **Response Examples ({content_type})**:""")
                                 for example_name, example_details in example_data['examples'].items():
                                     summary = example_details.get('summary', example_name)
                                     value = example_details.get('value', {})
-                                    result_text += f"""
-    - {summary}: {api_docs._safe_json_serialize(value)}"""
+                                    parts.append(f"""
+    - {summary}: {api_docs._safe_json_serialize(value)}""")
                             elif example_data['type'] == 'generated':
-                                result_text += f"""
-  **Example Response ({content_type})**: {api_docs._safe_json_serialize(example_data['value'])}"""
-        
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=result_text
-                )
-            ]
-        )
+                                parts.append(f"""
+  **Example Response ({content_type})**: {api_docs._safe_json_serialize(example_data['value'])}""")
+        
+        return _text_result(''.join(parts))
     
     except Exception as e:
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=f"Error getting endpoint details: {str(e)}"
-                )
-            ]
-        )
+        return _text_result(f"Error getting endpoint details: {str(e)}")
 
 
 @mcp.tool()
@@ -580,40 +851,19 @@ def list_api_tags() -> CallToolResult:
         List of all API tags with their descriptions
     """
     try:
-        tags = api_docs.list_tags()
+        tags = api_docs.tags.values()
         
         if not tags:
-            return CallToolResult(
-                content=[
-                    TextContent(
-                        type="text",
-                        text="No tags found in the API specification"
-                    )
-                ]
-            )
+            return _text_result("No tags found in the API specification")
         
         formatted_tags = []
         for tag in tags:
             formatted_tags.append(f"**{tag['name']}**: {tag.get('description', 'No description')}")
         
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text="Available API Tags:\n\n" + "\n".join(formatted_tags)
-                )
-            ]
-        )
+        return _text_result("Available API Tags:\n\n" + "\n".join(formatted_tags))
     
     except Exception as e:
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=f"Error listing tags: {str(e)}"
-                )
-            ]
-        )
+        return _text_result(f"Error listing tags: {str(e)}")
 
 
 @mcp.tool()
@@ -631,42 +881,21 @@ def get_tag_endpoints(tag_name: str) -> CallToolResult:
         endpoints = api_docs.get_tag_endpoints(tag_name)
         
         if not endpoints:
-            return CallToolResult(
-                content=[
-                    TextContent(
-                        type="text",
-                        text=f"No endpoints found for tag '{tag_name}'"
-                    )
-                ]
-            )
+            return _text_result(f"No endpoints found for tag '{tag_name}'")
         
         formatted_endpoints = []
         for endpoint in endpoints:
             formatted_endpoints.append(f"""
 **{endpoint['endpoint']}**
 - Summary: {endpoint['summary']}
-- Description: {endpoint['description'][:150]}{'...' if len(endpoint['description']) > 150 else ''}
+- Description: {endpoint['description_preview']}
 - Operation ID: {endpoint['operationId']}""")
         
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=f"Endpoints for tag '{tag_name}' ({len(endpoints)} found):\n" + 
-                         "\n".join(formatted_endpoints)
-                )
-            ]
-        )
+        return _text_result(f"Endpoints for tag '{tag_name}' ({len(endpoints)} found):\n" +
+                            "\n".join(formatted_endpoints))
     
     except Exception as e:
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=f"Error getting tag endpoints: {str(e)}"
-                )
-            ]
-        )
+        return _text_result(f"Error getting tag endpoints: {str(e)}")
 
 
 @mcp.tool()
@@ -681,52 +910,31 @@ def get_schema_info(schema_name: str) -> CallToolResult:
         Detailed information about the schema including properties and types
     """
     try:
-        schema = api_docs.get_schema_info(schema_name)
+        schema = api_docs.schemas.get(schema_name)
         
         if not schema:
-            return CallToolResult(
-                content=[
-                    TextContent(
-                        type="text",
-                        text=f"Schema '{schema_name}' not found"
-                    )
-                ]
-            )
+            return _text_result(f"Schema '{schema_name}' not found")
         
-        result_text = f"""
+        parts = [f"""
 **Schema: {schema_name}**
 
 **Description**: {schema.get('description', 'N/A')}
 
 **Type**: {schema.get('type', 'N/A')}
 
-**Properties**:"""
+**Properties**:"""]
         
         for prop_name, prop_details in schema.get('properties', {}).items():
             prop_type = prop_details.get('type', 'N/A')
             prop_desc = prop_details.get('description', 'N/A')
             required = prop_name in schema.get('required', [])
-            result_text += f"""
-- {prop_name} ({prop_type}) - {prop_desc} - Required: {required}"""
-        
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=result_text
-                )
-            ]
-        )
+            parts.append(f"""
+- {prop_name} ({prop_type}) - {prop_desc} - Required: {required}""")
+        
+        return _text_result(''.join(parts))
     
     except Exception as e:
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=f"Error getting schema info: {str(e)}"
-                )
-            ]
-        )
+        return _text_result(f"Error getting schema info: {str(e)}")
 
 
 
@@ -754,30 +962,18 @@ def get_api_info() -> CallToolResult:
 - Total Tags: {info['total_tags']}
 - Total Schemas: {info['total_schemas']}
 """
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=result_text
-                )
-            ]
-        )
+        return _text_result(result_text)
     
     except Exception as e:
-        return CallToolResult(
-            content=[
-                TextContent(
-                    type="text",
-                    text=f"Error getting API info: {str(e)}"
-                )
-            ]
-        )
+        return _text_result(f"Error getting API info: {str(e)}")
 
 
 def main():
     """Main entry point for the MCP server."""
-    print("Starting ThingsBoard API Documentation MCP Server...")
-    mcp.run(transport="streamable-http")
+    # stdio skips the HTTP stack entirely, for clients that launch the server as a subprocess
+    transport = os.getenv("MCP_TRANSPORT", "streamable-http")
+    print(f"Starting ThingsBoard API Documentation MCP Server ({transport})...", file=sys.stderr)
+    mcp.run(transport=transport)
 
 
 if __name__ == "__main__":
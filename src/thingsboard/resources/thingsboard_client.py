@@ -1,86 +1,270 @@
+from dataclasses import dataclass
 from typing import Optional, Any
+import asyncio
 import httpx
+import orjson
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
+_SUPPORTED_METHODS = frozenset(("GET", "POST", "PUT", "DELETE"))
+_BODY_METHODS = frozenset(("POST", "PUT"))
+# Telemetry queries over long time ranges can take a while, so allow more than httpx's default of 5 seconds
+REQUEST_TIMEOUT = httpx.Timeout(30.0)
+# Maximum number of cached GET responses; the oldest entries are evicted first
+RESPONSE_CACHE_SIZE = 256
+
+
+@dataclass(frozen=True, slots=True)
+class Config:
+    """Connection settings of the ThingsBoard API."""
+
+    api_base: Optional[str]
+    username: Optional[str]
+    password: Optional[str]
+    verify_tls: bool = True
+    # "httpx", or "aiohttp" for higher throughput under many concurrent requests (requires the aiohttp extra)
+    http_backend: str = "httpx"
+
+    @classmethod
+    def from_env(cls) -> "Config":
+        """Read the settings from the environment."""
+        return cls(
+            api_base=os.getenv("THINGSBOARD_API_BASE", None),
+            username=os.getenv("THINGSBOARD_USERNAME", None),
+            password=os.getenv("THINGSBOARD_PASSWORD", None),
+            verify_tls=os.getenv("THINGSBOARD_VERIFY_TLS", "true").lower() == "true",
+            http_backend=os.getenv("THINGSBOARD_HTTP_BACKEND", "httpx").lower(),
+        )
+
+    @property
+    def base_url(self) -> str:
+        """URL that API endpoints are resolved against."""
+        return f"{(self.api_base or '').rstrip('/')}/"
+
+
+CONFIG = Config.from_env()
+
 class ThingsboardClient:
 
     _auth_token: Optional[str] = None
+    # Incremented on every login, so concurrent requests rejected with the same token log in only once
+    _auth_epoch: int = 0
+    _auth_lock = asyncio.Lock()
+    # Serialized once, as it is sent unchanged on every login
+    _login_body: bytes = orjson.dumps({"username": CONFIG.username, "password": CONFIG.password})
+    # Shared by all requests, so connections (and TLS sessions) to ThingsBoard are kept alive and reused
+    _client: Optional[httpx.AsyncClient] = None
+    _sync_client: Optional[httpx.Client] = None
+    # aiohttp.ClientSession used instead of the async client with the aiohttp backend
+    _session: Any = None
+    # Responses of GET requests made with a cache TTL, by (endpoint, params): (expiry time, response)
+    _response_cache: dict = {}
+    # GET requests currently in flight, by (endpoint, params), so identical concurrent requests are sent only once
+    _inflight: dict = {}
 
     @classmethod
     def initialize_thingsboard_client(cls) -> None:
         if cls._auth_token is None:
-            cls.get_auth_token()
+            try:
+                cls.get_auth_token()
+            finally:
+                # Only needed for this login at startup
+                if cls._sync_client is not None:
+                    cls._sync_client.close()
+                    cls._sync_client = None
 
     @classmethod
-    async def make_thingsboard_request(cls, endpoint: str, params: Optional[dict] = None, method: str = "GET", data: Optional[dict] = None) -> Any:
-        """Execute a request to the ThingsBoard API."""
+    def _get_client(cls) -> httpx.AsyncClient:
+        """Get the shared HTTP client, creating it on first use."""
+        if cls._client is None:
+            # Endpoints are resolved against the API base, and every request is JSON
+            cls._client = httpx.AsyncClient(
+                base_url=CONFIG.base_url,
+                headers={"Content-Type": "application/json"},
+                verify=CONFIG.verify_tls,
+                timeout=REQUEST_TIMEOUT,
+                http2=True,
+                limits=httpx.Limits(max_connections=100, max_keepalive_connections=20),
+            )
+            if cls._auth_token:
+                cls._client.headers["Authorization"] = f"Bearer {cls._auth_token}"
+        return cls._client
+
+    @classmethod
+    def _get_sync_client(cls) -> httpx.Client:
+        """Get the shared synchronous HTTP client used to log in, creating it on first use."""
+        if cls._sync_client is None:
+            cls._sync_client = httpx.Client(
+                base_url=CONFIG.base_url,
+                headers={"Content-Type": "application/json"},
+                verify=CONFIG.verify_tls,
+                timeout=REQUEST_TIMEOUT,
+                http2=True,
+            )
+        return cls._sync_client
+
+    @classmethod
+    def _get_session(cls) -> Any:
+        """Get the shared aiohttp session, creating it on first use."""
+        if cls._session is None:
+            import aiohttp
+
+            cls._session = aiohttp.ClientSession(
+                base_url=CONFIG.base_url,
+                headers={"Content-Type": "application/json"},
+                timeout=aiohttp.ClientTimeout(total=REQUEST_TIMEOUT.read),
+                connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, keepalive_timeout=60, ssl=None if CONFIG.verify_tls else False),
+            )
+            if cls._auth_token:
+                cls._session.headers["Authorization"] = f"Bearer {cls._auth_token}"
+        return cls._session
+
+    @classmethod
+    async def aclose(cls) -> None:
+        """Close the shared HTTP clients and their connections."""
+        if cls._client is not None:
+            await cls._client.aclose()
+            cls._client = None
+        if cls._sync_client is not None:
+            cls._sync_client.close()
+            cls._sync_client = None
+        if cls._session is not None:
+            await cls._session.close()
+            cls._session = None
+
+    @classmethod
+    async def make_thingsboard_request(cls, endpoint: str, params: Optional[dict] = None, method: str = "GET", data: Optional[dict] = None, cache_ttl: Optional[float] = None, coalesce: bool = True) -> Any:
+        """Execute a request to the ThingsBoard API.
+
+        The successful response of a GET request with a cache_ttl is reused for that many seconds,
+        for data that changes slowly (or not at all). Concurrent identical GET requests share a single
+        request and response, unless coalesce is False. Callers must not modify shared responses.
+        """
+
+        http_method = method.upper()
+        if http_method not in _SUPPORTED_METHODS:
+            return {"error": f"Unsupported HTTP method: {method}"}
+        # Only POST and PUT requests carry the data as JSON body, serialized once (also for a retry) with orjson
+        try:
+            body = orjson.dumps(data) if http_method in _BODY_METHODS and data is not None else None
+        except orjson.JSONEncodeError as e:
+            return {"error": "Unable to fetch data from ThingsBoard", "details": str(e)}
+
+        if http_method != "GET" or not (cache_ttl or coalesce):
+            return await cls._execute_request(http_method, endpoint, params, body)
+
+        request_key = (endpoint, tuple(sorted(params.items())) if params else ())
+        if cache_ttl:
+            cached = cls._response_cache.get(request_key)
+            if cached is not None and cached[0] > time.monotonic():
+                return cached[1]
+        if not coalesce:
+            return await cls._execute_request(http_method, endpoint, params, None, request_key, cache_ttl)
 
+        inflight = cls._inflight.get(request_key)
+        if inflight is None:
+            inflight = asyncio.ensure_future(cls._execute_request(http_method, endpoint, params, None, request_key, cache_ttl))
+            cls._inflight[request_key] = inflight
+            inflight.add_done_callback(lambda _: cls._inflight.pop(request_key, None))
+        # Shielded, so a cancelled caller does not cancel the request for the others
+        return await asyncio.shield(inflight)
+
+    @classmethod
+    async def _execute_request(cls, http_method: str, endpoint: str, params: Optional[dict], body: Optional[bytes], cache_key: Optional[tuple] = None, cache_ttl: Optional[float] = None) -> Any:
+        """Execute a request, caching a successful response under cache_key if a cache_ttl is given."""
         if not cls._auth_token:
-            cls.get_auth_token()
+            await cls._refresh_auth_token(cls._auth_epoch)
 
-        THINGSBOARD_API_BASE = os.getenv("THINGSBOARD_API_BASE", None)
-        url = f"{THINGSBOARD_API_BASE}/{endpoint}"
-        headers = {"Authorization": f"Bearer {cls._auth_token}", "Content-Type": "application/json"}
-        
-        verify_tls = os.getenv("THINGSBOARD_VERIFY_TLS", "true").lower() == "true"
+        try:
+            result = await cls._send_request(http_method, endpoint, params, body)
+        except Exception as e:
+            error = {"error": "Unable to fetch data from ThingsBoard", "details": str(e)}
+            # HTTP status of a rejected request, e.g. 409 when a device profile was saved with an outdated version
+            status = e.response.status_code if isinstance(e, httpx.HTTPStatusError) else getattr(e, "status", None)
+            if isinstance(status, int):
+                error["status"] = status
+            return error
+
+        if cache_ttl:
+            cls._response_cache.pop(cache_key, None)
+            cls._response_cache[cache_key] = (time.monotonic() + cache_ttl, result)
+            if len(cls._response_cache) > RESPONSE_CACHE_SIZE:
+                del cls._response_cache[next(iter(cls._response_cache))]
+        return result
 
-        async with httpx.AsyncClient(verify=verify_tls) as client:
+    @classmethod
+    async def _send_request(cls, http_method: str, endpoint: str, params: Optional[dict], body: Optional[bytes]) -> Any:
+        """Send a request with the current token, logging in again if it was rejected."""
+        send = cls._send_aiohttp if CONFIG.http_backend == "aiohttp" else cls._send_httpx
+        epoch = cls._auth_epoch
+        content = await send(http_method, endpoint, params, body, True)
+        # If unauthorized, refresh the token and retry once
+        if content is None:
+            await cls._refresh_auth_token(epoch)
+            content = await send(http_method, endpoint, params, body, False)
+        return orjson.loads(content)
+
+    @classmethod
+    async def _send_httpx(cls, http_method: str, endpoint: str, params: Optional[dict], body: Optional[bytes], allow_unauthorized: bool) -> Optional[bytes]:
+        """Send a request with httpx and return the response body, or None if it was unauthorized and that is allowed."""
+        # The token is sent in the default headers of the client
+        response = await cls._get_client().request(http_method, endpoint, params=params, content=body)
+        if allow_unauthorized and response.status_code == 401:
+            return None
+        response.raise_for_status()
+        return response.content
+
+    @classmethod
+    async def _send_aiohttp(cls, http_method: str, endpoint: str, params: Optional[dict], body: Optional[bytes], allow_unauthorized: bool) -> Optional[bytes]:
+        """Send a request with aiohttp and return the response body, or None if it was unauthorized and that is allowed."""
+        async with cls._get_session().request(http_method, endpoint, params=params, data=body) as response:
+            if allow_unauthorized and response.status == 401:
+                return None
+            response.raise_for_status()
+            return await response.read()
+    
+    @classmethod
+    async def _refresh_auth_token(cls, epoch: int) -> None:
+        """Log in again, unless another request already did since the token of the given epoch was used."""
+        async with cls._auth_lock:
+            if cls._auth_epoch != epoch:
+                return
             try:
-                if method.upper() == "GET":
-                    response = await client.get(url, headers=headers, params=params)
-                elif method.upper() == "POST":
-                    response = await client.post(url, headers=headers, params=params, json=data)
-                elif method.upper() == "PUT":
-                    response = await client.put(url, headers=headers, params=params, json=data)
-                elif method.upper() == "DELETE":
-                    response = await client.delete(url, headers=headers, params=params)
+                if CONFIG.http_backend == "aiohttp":
+                    async with cls._get_session().post("auth/login", data=cls._login_body) as response:
+                        response.raise_for_status()
+                        cls._store_auth_token(await response.read())
                 else:
-                    return {"error": f"Unsupported HTTP method: {method}"}
-                
-                response.raise_for_status()
-                return response.json()
-            except httpx.HTTPStatusError as e:
-                # If unauthorized, refresh the token and retry
-                if e.response.status_code == 401:
-                    cls.initialize_thingsboard_client()
-                    headers["Authorization"] = f"Bearer {cls._auth_token}"
-                    
-                    if method.upper() == "GET":
-                        response = await client.get(url, headers=headers, params=params)
-                    elif method.upper() == "POST":
-                        response = await client.post(url, headers=headers, params=params, json=data)
-                    elif method.upper() == "PUT":
-                        response = await client.put(url, headers=headers, params=params, json=data)
-                    elif method.upper() == "DELETE":
-                        response = await client.delete(url, headers=headers, params=params)
-                    
-                    response.raise_for_status()
-                    return response.json()
-                return {"error": "Unable to fetch data from ThingsBoard", "details": str(e)}
+                    response = await cls._get_client().post("auth/login", content=cls._login_body)
+                    cls._set_auth_token(response)
             except Exception as e:
-                return {"error": "Unable to fetch data from ThingsBoard", "details": str(e)}
-    
+                raise ValueError(f"Error getting token: {e}")
+
     @classmethod
     def get_auth_token(cls) -> None:
         """Retrieve the authentication token."""
+        # Synchronous, for logging in before the event loop runs
         try:
-            thingsboard_username = os.getenv("THINGSBOARD_USERNAME", None)
-            thingsboard_password = os.getenv("THINGSBOARD_PASSWORD", None)
-            data = {
-                "username": thingsboard_username,
-                "password": thingsboard_password
-            }
-            
-            THINGSBOARD_API_BASE = os.getenv("THINGSBOARD_API_BASE", None)
-            
-            verify_tls = os.getenv("THINGSBOARD_VERIFY_TLS", "true").lower() == "true"
-            
-            with httpx.Client(verify=verify_tls) as client:
-                response = client.post(f"{THINGSBOARD_API_BASE}/auth/login", json=data)
-                response.raise_for_status()
-                cls._auth_token = response.json()["token"]
+            response = cls._get_sync_client().post("auth/login", content=cls._login_body)
+            cls._set_auth_token(response)
         except Exception as e:
-            raise ValueError(f"Error getting token: {e}")
\ No newline at end of file
+            raise ValueError(f"Error getting token: {e}")
+
+    @classmethod
+    def _set_auth_token(cls, response: httpx.Response) -> None:
+        """Store the token of a login response."""
+        response.raise_for_status()
+        cls._store_auth_token(response.content)
+
+    @classmethod
+    def _store_auth_token(cls, content: bytes) -> None:
+        """Store the token of a login response body, and send it with all further requests."""
+        cls._auth_token = orjson.loads(content)["token"]
+        cls._auth_epoch += 1
+        if cls._client is not None:
+            cls._client.headers["Authorization"] = f"Bearer {cls._auth_token}"
+        if cls._session is not None:
+            cls._session.headers["Authorization"] = f"Bearer {cls._auth_token}"
\ No newline at end of file
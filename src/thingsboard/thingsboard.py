@@ -1,5 +1,4 @@
-import os
-from dotenv import load_dotenv
+import asyncio
 import sys
 
 from resources.mcp_server import mcp
@@ -8,29 +7,36 @@ import tools.telemetry
 import tools.assets
 import tools.relations
 import tools.alarm_rules
-from resources.thingsboard_client import ThingsboardClient
+from resources.thingsboard_client import ThingsboardClient, CONFIG
 
-load_dotenv()
 
-# Environment variables
-THINGSBOARD_API_BASE = os.getenv("THINGSBOARD_API_BASE", None)
-THINGSBOARD_USERNAME = os.getenv("THINGSBOARD_USERNAME", None)
-THINGSBOARD_PASSWORD = os.getenv("THINGSBOARD_PASSWORD", None)
-THINGSBOARD_VERIFY_TLS = os.getenv("THINGSBOARD_VERIFY_TLS", "true").lower() == "true"
+async def serve() -> None:
+    """Run the MCP server on the current event loop, and close the ThingsBoard connections when it stops."""
+    try:
+        await mcp.run_streamable_http_async()
+    finally:
+        await ThingsboardClient.aclose()
 
 
 if __name__ == "__main__":
     # TODO: Move to a separate file
-    if not THINGSBOARD_API_BASE:
+    if not CONFIG.api_base:
         print("Missing THINGSBOARD_API_BASE environment variable")
         sys.exit(1)
-    if not THINGSBOARD_USERNAME:
+    if not CONFIG.username:
         print("Missing THINGSBOARD_USERNAME environment variable")
         sys.exit(1)
-    if not THINGSBOARD_PASSWORD:
+    if not CONFIG.password:
         print("Missing THINGSBOARD_PASSWORD environment variable")
         sys.exit(1)
         
     ThingsboardClient.initialize_thingsboard_client()
+
+    # uvloop is faster than the default event loop, but not available on Windows
+    try:
+        import uvloop
+        asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    except ImportError:
+        pass
         
-    mcp.run(transport="streamable-http")
+    asyncio.run(serve())
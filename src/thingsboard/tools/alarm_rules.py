@@ -1,10 +1,217 @@
 from resources.mcp_server import mcp
-from typing import Any, Optional
+from collections import OrderedDict
+from typing import Any, Callable, Optional
 from resources.thingsboard_client import ThingsboardClient
+import asyncio
+import logging
+import orjson
+import time
 import uuid
+import weakref
+
+logger = logging.getLogger(__name__)
+
+# Seconds for which a fetched or saved device profile is reused, e.g. when listing and then updating alarm rules
+PROFILE_CACHE_TTL = 30
+
+# Seconds for which a page of the device profile list is served from the cache, and after that
+# for how many more seconds it is still served while it is refreshed in the background
+PROFILE_PAGES_CACHE_TTL = 60
+PROFILE_PAGES_STALE_TTL = 60
+# Maximum number of cached pages of the device profile list; the least recently used are evicted first
+PROFILE_PAGES_CACHE_SIZE = 32
+
+# Seconds to wait for further changes to a device profile, so that a burst of alarm rule changes is saved at once
+MUTATION_BATCH_DELAY = 0.05
+
+# Device profiles by id: (expiry time, profile serialized as JSON), so every reader gets a copy it may modify
+_profile_cache: dict = {}
+
+# Pages of the device profile list by request parameters: (time fetched, page)
+_profile_pages_cache: OrderedDict = OrderedDict()
+# Incremented whenever a device profile is saved, so pages fetched before are not cached afterwards
+_profile_pages_generation = 0
+# Background refreshes of stale pages by request parameters
+_profile_page_refreshes: dict = {}
+
+# Changes waiting to be applied to each device profile: [(mutation, future of the caller)]
+_pending_mutations: dict = {}
+# Scheduled saves of each device profile with pending changes
+_flush_tasks: dict = {}
+# Held while a batch of changes to a device profile is applied and saved, so batches do not overlap
+_profile_locks: weakref.WeakValueDictionary = weakref.WeakValueDictionary()
+
+# Number of finished bulk operations whose status is kept; the oldest are forgotten first
+OPERATION_HISTORY_SIZE = 100
+
+# Status of bulk alarm rule operations by operation ID: {"status": "running"|"done"|"error", "result": ...}
+_operations: dict = {}
+# Running bulk operations, referenced so they are not garbage collected before they finish
+_operation_tasks: set = set()
+
+# Operation of the clear rule for each operation of a create rule, so the alarm clears once its condition no longer holds
+_INVERSE_OP = {
+    "GREATER": "LESS_OR_EQUAL",
+    "GREATER_OR_EQUAL": "LESS",
+    "LESS": "GREATER_OR_EQUAL",
+    "LESS_OR_EQUAL": "GREATER",
+    "EQUAL": "NOT_EQUAL",
+    "NOT_EQUAL": "EQUAL",
+}
+
+async def _fetch_device_profile(profile_id: str) -> Any:
+    """Get a device profile, from the cache if it was fetched or saved recently.
+    
+    Every call returns a separate copy of the profile, which the caller may modify.
+    """
+    cached = _profile_cache.get(profile_id)
+    if cached is not None and cached[0] > time.monotonic():
+        return orjson.loads(cached[1])
+    
+    # Concurrent fetches of the same profile share one request, hence the copy
+    profile = await ThingsboardClient.make_thingsboard_request(f"deviceProfile/{profile_id}")
+    if "error" in profile:
+        return profile
+    serialized = orjson.dumps(profile)
+    _profile_cache[profile_id] = (time.monotonic() + PROFILE_CACHE_TTL, serialized)
+    return orjson.loads(serialized)
+
+async def _save_device_profile(profile_id: str, profile: dict) -> Any:
+    """Save a modified device profile, and cache the saved version returned by ThingsBoard."""
+    _profile_cache.pop(profile_id, None)
+    response = await ThingsboardClient.make_thingsboard_request("deviceProfile", method="POST", data=profile)
+    if "error" not in response:
+        _profile_cache[profile_id] = (time.monotonic() + PROFILE_CACHE_TTL, orjson.dumps(response))
+        _invalidate_profile_pages()
+    return response
+
+def _invalidate_profile_pages() -> None:
+    """Forget the cached pages of the device profile list, after a device profile changed."""
+    global _profile_pages_generation
+    _profile_pages_generation += 1
+    _profile_pages_cache.clear()
+
+async def _fetch_device_profiles_page(params: dict) -> Any:
+    """Fetch a page of the device profile list with its essential fields, and cache it."""
+    generation = _profile_pages_generation
+    response = await ThingsboardClient.make_thingsboard_request("deviceProfiles", params)
+    
+    # Filter the response to include only essential fields
+    if "data" in response and isinstance(response["data"], list):
+        filtered_profiles = [
+            {
+                "id": (profile.get("id") or {}).get("id"),
+                "name": profile.get("name"),
+                "description": profile.get("description"),
+                "type": profile.get("type"),
+                "transportType": profile.get("transportType"),
+                "provisionType": profile.get("provisionType"),
+                "default": profile.get("default", False)
+            }
+            for profile in response["data"]
+        ]
+        
+        page = {
+            "data": filtered_profiles,
+            "totalElements": response.get("totalElements"),
+            "totalPages": response.get("totalPages"),
+            "hasNext": response.get("hasNext")
+        }
+        # Not cached if a device profile was saved in the meantime, as the page may be outdated
+        if generation == _profile_pages_generation:
+            key = tuple(params.items())
+            _profile_pages_cache[key] = (time.monotonic(), page)
+            _profile_pages_cache.move_to_end(key)
+            if len(_profile_pages_cache) > PROFILE_PAGES_CACHE_SIZE:
+                _profile_pages_cache.popitem(last=False)
+        return page
+    
+    return response
+
+def _refresh_device_profiles_page(params: dict) -> None:
+    """Refresh a cached page of the device profile list in the background, unless that is already happening."""
+    key = tuple(params.items())
+    if key not in _profile_page_refreshes:
+        task = asyncio.create_task(_fetch_device_profiles_page(params))
+        _profile_page_refreshes[key] = task
+        task.add_done_callback(lambda _: _finish_device_profiles_page_refresh(key, task))
+
+def _finish_device_profiles_page_refresh(key: tuple, task: asyncio.Task) -> None:
+    """Forget a finished background refresh of a page, and log why it failed, as no caller awaits it."""
+    _profile_page_refreshes.pop(key, None)
+    if not task.cancelled() and task.exception() is not None:
+        logger.warning(f"Refreshing a page of the device profile list failed: {task.exception()}")
+
+async def _mutate_device_profile(profile_id: str, mutation: Callable[[dict], Optional[dict]]) -> Any:
+    """Apply a change to a device profile and save it, together with the other changes queued for that profile.
+    
+    Changes that arrive within MUTATION_BATCH_DELAY of each other are applied to one copy of the
+    profile in order, which is then saved once. The mutation modifies the profile in place and
+    returns None, or returns an error dict to leave it unchanged.
+    
+    Returns:
+        The saved device profile, or the error of this change, of fetching or of saving the profile
+    """
+    future = asyncio.get_running_loop().create_future()
+    _pending_mutations.setdefault(profile_id, []).append((mutation, future))
+    if profile_id not in _flush_tasks:
+        _flush_tasks[profile_id] = asyncio.create_task(_flush_mutations(profile_id))
+    return await future
+
+def _apply_mutations(profile: dict, mutations: list) -> list:
+    """Apply changes to a device profile in order, and return the result of each: None, an error dict or the exception raised."""
+    results = []
+    for mutation in mutations:
+        # Restored if the change fails, so that it is not saved half-applied
+        snapshot = orjson.dumps(profile)
+        try:
+            result = mutation(profile)
+        except Exception as e:
+            result = e
+        if result is not None:
+            profile.clear()
+            profile.update(orjson.loads(snapshot))
+        results.append(result)
+    return results
+
+async def _flush_mutations(profile_id: str) -> None:
+    """Apply the queued changes of a device profile after MUTATION_BATCH_DELAY, and save the profile once."""
+    await asyncio.sleep(MUTATION_BATCH_DELAY)
+    # Changes queued from now on start a new batch, which is saved after this one
+    del _flush_tasks[profile_id]
+    batch = _pending_mutations.pop(profile_id)
+    # Referenced by every batch waiting for or holding it, and dropped from the map once no batch does
+    lock = _profile_locks.get(profile_id)
+    if lock is None:
+        lock = _profile_locks[profile_id] = asyncio.Lock()
+    async with lock:
+        try:
+            # The profile usually comes from the cache; if ThingsBoard rejects it as outdated, the
+            # changes are applied once more to the current profile
+            for attempt in range(2):
+                profile = await _fetch_device_profile(profile_id)
+                if "error" in profile:
+                    results = [profile] * len(batch)
+                    break
+                results = _apply_mutations(profile, [mutation for mutation, _ in batch])
+                if all(result is not None for result in results):
+                    break
+                saved_profile = await _save_device_profile(profile_id, profile)
+                if saved_profile.get("status") != 409 or attempt:
+                    results = [saved_profile if result is None else result for result in results]
+                    break
+        except Exception as e:
+            results = [e] * len(batch)
+    for (_, future), result in zip(batch, results):
+        if future.done():
+            continue
+        if isinstance(result, Exception):
+            future.set_exception(result)
+        else:
+            future.set_result(result)
 
 @mcp.tool()
-async def get_device_profiles(page: int = 0, page_size: int = 10) -> Any:
+async def get_device_profiles(page: int = 0, page_size: int = 10, text_search: Optional[str] = None, sort_property: Optional[str] = None, sort_order: Optional[str] = None, force_refresh: bool = False) -> Any:
     """Retrieve a paginated list of device profiles from ThingsBoard.
     
     Use this tool when you need to:
@@ -16,6 +223,10 @@ async def get_device_profiles(page: int = 0, page_size: int = 10) -> Any:
     Args:
         page (int): Page number for pagination (0-based). Default: 0
         page_size (int): Number of profiles per page. Default: 10, max recommended: 50
+        text_search (str, optional): Only return profiles whose name contains this text (case-insensitive)
+        sort_property (str, optional): Property to sort by. Options: createdTime, name, type, transportType, description, isDefault
+        sort_order (str, optional): Sort direction. Options: ASC, DESC
+        force_refresh (bool): Fetch the profiles from ThingsBoard even if the page was retrieved recently. Default: False
     
     Returns:
         Dict containing:
@@ -24,33 +235,29 @@ async def get_device_profiles(page: int = 0, page_size: int = 10) -> Any:
         - totalPages: Total number of pages available
         - hasNext: Boolean indicating if more pages exist
     """
-    endpoint = "deviceProfiles"
     params = {"page": page, "pageSize": page_size}
-    response = await ThingsboardClient.make_thingsboard_request(endpoint, params)
-    
-    # Filter the response to include only essential fields
-    if "data" in response and isinstance(response["data"], list):
-        filtered_profiles = []
-        for profile in response["data"]:
-            filtered_profile = {
-                "id": profile.get("id", {}).get("id"),
-                "name": profile.get("name"),
-                "description": profile.get("description"),
-                "type": profile.get("type"),
-                "transportType": profile.get("transportType"),
-                "provisionType": profile.get("provisionType"),
-                "default": profile.get("default", False)
-            }
-            filtered_profiles.append(filtered_profile)
-        
-        return {
-            "data": filtered_profiles,
-            "totalElements": response.get("totalElements"),
-            "totalPages": response.get("totalPages"),
-            "hasNext": response.get("hasNext")
-        }
-    
-    return response
+    # Let ThingsBoard filter and sort, so only the matching profiles are transferred
+    if text_search:
+        params["textSearch"] = text_search
+    if sort_property:
+        params["sortProperty"] = sort_property
+    if sort_order:
+        params["sortOrder"] = sort_order
+    
+    key = tuple(params.items())
+    cached = _profile_pages_cache.get(key)
+    if cached is not None and not force_refresh:
+        # Mark the page as recently used, so the pages that are read most stay cached
+        _profile_pages_cache.move_to_end(key)
+        age = time.monotonic() - cached[0]
+        if age < PROFILE_PAGES_CACHE_TTL:
+            return cached[1]
+        if age < PROFILE_PAGES_CACHE_TTL + PROFILE_PAGES_STALE_TTL:
+            # Serve the stale page right away, and refresh it for the next call
+            _refresh_device_profiles_page(params)
+            return cached[1]
+    
+    return await _fetch_device_profiles_page(params)
 
 @mcp.tool()
 async def get_device_profile(profile_id: str) -> Any:
@@ -69,8 +276,7 @@ async def get_device_profile(profile_id: str) -> Any:
     Returns:
         Dict containing the complete device profile with alarm rules configuration
     """
-    endpoint = f"deviceProfile/{profile_id}"
-    return await ThingsboardClient.make_thingsboard_request(endpoint)
+    return await _fetch_device_profile(profile_id)
 
 @mcp.tool()
 async def create_alarm_rule(
@@ -110,12 +316,6 @@ async def create_alarm_rule(
     Returns:
         Dict containing the updated device profile with the new alarm rule
     """
-    # First, get the current device profile
-    current_profile = await get_device_profile(profile_id)
-    
-    if "error" in current_profile:
-        return current_profile
-    
     # Create the alarm rule structure
     alarm_rule = {
         "id": str(uuid.uuid4()),
@@ -166,7 +366,7 @@ async def create_alarm_rule(
                         "valueType": condition_value_type,
                         "predicate": {
                             "type": condition_value_type,
-                            "operation": "LESS_OR_EQUAL" if condition_operation == "GREATER" else "GREATER_OR_EQUAL",
+                            "operation": _INVERSE_OP.get(condition_operation, "GREATER_OR_EQUAL"),
                             "value": {
                                 "userValue": None,
                                 "defaultValue": condition_value,
@@ -188,18 +388,12 @@ async def create_alarm_rule(
         "propagateRelationTypes": []
     }
     
-    # Add the alarm rule to the profile
-    if "profileData" not in current_profile:
-        current_profile["profileData"] = {}
-    
-    if "alarms" not in current_profile["profileData"]:
-        current_profile["profileData"]["alarms"] = []
-    
-    current_profile["profileData"]["alarms"].append(alarm_rule)
+    def add_alarm_rule(current_profile: dict) -> None:
+        # Add the alarm rule to the profile
+        current_profile.setdefault("profileData", {}).setdefault("alarms", []).append(alarm_rule)
     
     # Update the device profile
-    endpoint = "deviceProfile"
-    return await ThingsboardClient.make_thingsboard_request(endpoint, method="POST", data=current_profile)
+    return await _mutate_device_profile(profile_id, add_alarm_rule)
 
 @mcp.tool()
 async def update_alarm_rule(
@@ -235,66 +429,55 @@ async def update_alarm_rule(
     Returns:
         Dict containing the updated device profile
     """
-    # First, get the current device profile
-    current_profile = await get_device_profile(profile_id)
-    
-    if "error" in current_profile:
-        return current_profile
+    def update_alarm(current_profile: dict) -> Optional[dict]:
+        # Find the alarm rule to update
+        alarm_rule = None
     
-    # Find the alarm rule to update
-    alarm_rule = None
-    alarm_index = None
+        if "profileData" in current_profile and "alarms" in current_profile["profileData"]:
+            alarm_rule = next((alarm for alarm in current_profile["profileData"]["alarms"] if alarm.get("id") == alarm_id), None)
     
-    if "profileData" in current_profile and "alarms" in current_profile["profileData"]:
-        for i, alarm in enumerate(current_profile["profileData"]["alarms"]):
-            if alarm.get("id") == alarm_id:
-                alarm_rule = alarm
-                alarm_index = i
-                break
+        if not alarm_rule:
+            return {"error": f"Alarm rule with ID {alarm_id} not found in profile {profile_id}"}
     
-    if not alarm_rule:
-        return {"error": f"Alarm rule with ID {alarm_id} not found in profile {profile_id}"}
+        # Update the alarm rule fields
+        if alarm_type is not None:
+            alarm_rule["alarmType"] = alarm_type
     
-    # Update the alarm rule fields
-    if alarm_type is not None:
-        alarm_rule["alarmType"] = alarm_type
+        if propagate is not None:
+            alarm_rule["propagate"] = propagate
     
-    if propagate is not None:
-        alarm_rule["propagate"] = propagate
+        if alarm_details is not None:
+            alarm_rule["alarmDetails"] = alarm_details
     
-    if alarm_details is not None:
-        alarm_rule["alarmDetails"] = alarm_details
-    
-    # Update create rules if severity is specified
-    if severity is not None and "createRules" in alarm_rule:
-        # Get the first severity level to update (or create new)
-        first_severity = list(alarm_rule["createRules"].keys())[0] if alarm_rule["createRules"] else severity
+        # Update create rules if severity is specified
+        if severity is not None and "createRules" in alarm_rule:
+            # Get the first severity level to update (or create new)
+            first_severity = list(alarm_rule["createRules"].keys())[0] if alarm_rule["createRules"] else severity
         
-        if severity not in alarm_rule["createRules"]:
-            # Create new severity level
-            alarm_rule["createRules"][severity] = alarm_rule["createRules"][first_severity].copy()
-            # Remove old severity if it's different
-            if first_severity != severity:
-                del alarm_rule["createRules"][first_severity]
+            if severity not in alarm_rule["createRules"]:
+                # Create new severity level
+                alarm_rule["createRules"][severity] = alarm_rule["createRules"][first_severity].copy()
+                # Remove old severity if it's different
+                if first_severity != severity:
+                    del alarm_rule["createRules"][first_severity]
         
-        # Update condition if specified
-        if any([condition_key, condition_operation, condition_value]):
-            create_rule = alarm_rule["createRules"][severity]
-            if "condition" in create_rule and "condition" in create_rule["condition"]:
-                condition = create_rule["condition"]["condition"][0]
+            # Update condition if specified
+            if any([condition_key, condition_operation, condition_value]):
+                create_rule = alarm_rule["createRules"][severity]
+                if "condition" in create_rule and "condition" in create_rule["condition"]:
+                    condition = create_rule["condition"]["condition"][0]
                 
-                if condition_key is not None:
-                    condition["key"]["key"] = condition_key
+                    if condition_key is not None:
+                        condition["key"]["key"] = condition_key
                 
-                if condition_operation is not None:
-                    condition["predicate"]["operation"] = condition_operation
+                    if condition_operation is not None:
+                        condition["predicate"]["operation"] = condition_operation
                 
-                if condition_value is not None:
-                    condition["predicate"]["value"]["defaultValue"] = condition_value
+                    if condition_value is not None:
+                        condition["predicate"]["value"]["defaultValue"] = condition_value
     
     # Update the device profile
-    endpoint = "deviceProfile"
-    return await ThingsboardClient.make_thingsboard_request(endpoint, method="POST", data=current_profile)
+    return await _mutate_device_profile(profile_id, update_alarm)
 
 @mcp.tool()
 async def delete_alarm_rule(profile_id: str, alarm_id: str) -> Any:
@@ -312,22 +495,45 @@ async def delete_alarm_rule(profile_id: str, alarm_id: str) -> Any:
     Returns:
         Dict containing the updated device profile without the deleted alarm rule
     """
-    # First, get the current device profile
-    current_profile = await get_device_profile(profile_id)
+    def remove_alarm_rule(current_profile: dict) -> Optional[dict]:
+        # Find and remove the alarm rule
+        alarms = current_profile.get("profileData", {}).get("alarms") or []
+        remaining_alarms = [alarm for alarm in alarms if alarm.get("id") != alarm_id]
     
-    if "error" in current_profile:
-        return current_profile
+        # Nothing was removed, so there is no need to save the profile
+        if len(remaining_alarms) == len(alarms):
+            return {"error": f"Alarm rule with ID {alarm_id} not found in profile {profile_id}"}
     
-    # Find and remove the alarm rule
-    if "profileData" in current_profile and "alarms" in current_profile["profileData"]:
-        alarms = current_profile["profileData"]["alarms"]
-        current_profile["profileData"]["alarms"] = [
-            alarm for alarm in alarms if alarm.get("id") != alarm_id
-        ]
+        current_profile["profileData"]["alarms"] = remaining_alarms
     
     # Update the device profile
-    endpoint = "deviceProfile"
-    return await ThingsboardClient.make_thingsboard_request(endpoint, method="POST", data=current_profile)
+    return await _mutate_device_profile(profile_id, remove_alarm_rule)
+
+def _extract_condition(condition: dict) -> dict:
+    """Summarize a condition of an alarm rule."""
+    key = condition.get("key") or {}
+    predicate = condition.get("predicate") or {}
+    return {
+        "key": key.get("key"),
+        "key_type": key.get("type"),
+        "value_type": condition.get("valueType"),
+        "operation": predicate.get("operation"),
+        "value": (predicate.get("value") or {}).get("defaultValue")
+    }
+
+def _extract_conditions(rule: dict) -> list:
+    """Summarize the conditions of a create or clear rule of an alarm rule."""
+    condition = rule.get("condition") or {}
+    return [_extract_condition(c) for c in condition.get("condition") or []]
+
+def _extract_clear_rule(clear_rule: Optional[dict]) -> Optional[dict]:
+    """Summarize the clear rule of an alarm rule, which is null for alarms that are cleared manually."""
+    if not clear_rule:
+        return None
+    return {
+        "schedule_type": (clear_rule.get("schedule") or {}).get("type", "ANY_TIME"),
+        "conditions": _extract_conditions(clear_rule)
+    }
 
 @mcp.tool()
 async def list_alarm_rules(profile_id: str) -> Any:
@@ -353,63 +559,145 @@ async def list_alarm_rules(profile_id: str) -> Any:
     if "error" in profile:
         return profile
     
-    alarm_rules = []
-    
-    if "profileData" in profile and "alarms" in profile["profileData"]:
-        for alarm in profile["profileData"]["alarms"]:
-            alarm_info = {
-                "id": alarm.get("id"),
-                "alarm_type": alarm.get("alarmType"),
-                "propagate": alarm.get("propagate", False),
-                "propagate_to_owner": alarm.get("propagateToOwner", False),
-                "propagate_to_tenant": alarm.get("propagateToTenant", False),
-                "create_rules": {},
-                "clear_rule": None
-            }
-            
-            # Extract create rules information
-            if "createRules" in alarm:
-                for severity, rule in alarm["createRules"].items():
-                    alarm_info["create_rules"][severity] = {
-                        "schedule_type": rule.get("schedule", {}).get("type", "ANY_TIME"),
-                        "alarm_details": rule.get("alarmDetails"),
-                        "conditions": []
-                    }
-                    
-                    # Extract condition information
-                    if "condition" in rule and "condition" in rule["condition"]:
-                        for condition in rule["condition"]["condition"]:
-                            condition_info = {
-                                "key": condition.get("key", {}).get("key"),
-                                "key_type": condition.get("key", {}).get("type"),
-                                "value_type": condition.get("valueType"),
-                                "operation": condition.get("predicate", {}).get("operation"),
-                                "value": condition.get("predicate", {}).get("value", {}).get("defaultValue")
-                            }
-                            alarm_info["create_rules"][severity]["conditions"].append(condition_info)
-            
-            # Extract clear rule information
-            if "clearRule" in alarm:
-                alarm_info["clear_rule"] = {
-                    "schedule_type": alarm["clearRule"].get("schedule", {}).get("type", "ANY_TIME"),
-                    "conditions": []
+    alarm_rules = [
+        {
+            "id": alarm.get("id"),
+            "alarm_type": alarm.get("alarmType"),
+            "propagate": alarm.get("propagate", False),
+            "propagate_to_owner": alarm.get("propagateToOwner", False),
+            "propagate_to_tenant": alarm.get("propagateToTenant", False),
+            "create_rules": {
+                severity: {
+                    "schedule_type": (rule.get("schedule") or {}).get("type", "ANY_TIME"),
+                    "alarm_details": rule.get("alarmDetails"),
+                    "conditions": _extract_conditions(rule)
                 }
-                
-                if "condition" in alarm["clearRule"] and "condition" in alarm["clearRule"]["condition"]:
-                    for condition in alarm["clearRule"]["condition"]["condition"]:
-                        condition_info = {
-                            "key": condition.get("key", {}).get("key"),
-                            "key_type": condition.get("key", {}).get("type"),
-                            "value_type": condition.get("valueType"),
-                            "operation": condition.get("predicate", {}).get("operation"),
-                            "value": condition.get("predicate", {}).get("value", {}).get("defaultValue")
-                        }
-                        alarm_info["clear_rule"]["conditions"].append(condition_info)
-            
-            alarm_rules.append(alarm_info)
+                for severity, rule in (alarm.get("createRules") or {}).items()
+            },
+            "clear_rule": _extract_clear_rule(alarm.get("clearRule"))
+        }
+        for alarm in (profile.get("profileData") or {}).get("alarms") or []
+    ]
     
     return {
         "profile_name": profile.get("name"),
         "profile_id": profile_id,
         "alarm_rules": alarm_rules
-    } 
\ No newline at end of file
+    }
+
+@mcp.tool()
+async def list_alarm_rules_bulk(profile_ids: str, concurrency: int = 8) -> Any:
+    """List the alarm rules of several device profiles at once.
+    
+    Use this tool when you need to:
+    - Audit the alarm rules of many or all device profiles
+    - Compare alarm configurations across device profiles
+    - Find which device profiles monitor a specific telemetry key
+    
+    The profiles are fetched concurrently, so this is much faster than calling
+    list_alarm_rules once per profile. Each profile gets the same result format as list_alarm_rules.
+    
+    Args:
+        profile_ids (str): Comma-separated list of device profile IDs
+                          (e.g., "123e4567-e89b-12d3-a456-426614174000,223e4567-e89b-12d3-a456-426614174000")
+        concurrency (int): Maximum number of profiles fetched at the same time. Default: 8
+    
+    Returns:
+        Dict mapping each profile ID to its alarm rules, as returned by list_alarm_rules.
+        Profiles that could not be retrieved map to a dict with an "error" field.
+    """
+    ids = list(dict.fromkeys(profile_id.strip() for profile_id in profile_ids.split(",") if profile_id.strip()))
+    # Limits the load on ThingsBoard when auditing many profiles
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def list_limited(profile_id: str) -> Any:
+        async with semaphore:
+            return await list_alarm_rules(profile_id)
+
+    results = await asyncio.gather(*[list_limited(profile_id) for profile_id in ids], return_exceptions=True)
+    return {
+        profile_id: {"error": "Unable to fetch data from ThingsBoard", "details": str(result)} if isinstance(result, Exception) else result
+        for profile_id, result in zip(ids, results)
+    }
+
+async def _run_bulk_operation(operation_id: str, profile_id: str, ops: list) -> None:
+    """Run the alarm rule changes of a bulk operation, and record the outcome in its status."""
+    actions = {"create": create_alarm_rule, "update": update_alarm_rule, "delete": delete_alarm_rule}
+    
+    async def run_op(op: dict) -> Any:
+        action = actions.get(op.get("action"))
+        if action is None:
+            return {"error": f"Unknown action: {op.get('action')}. Options: create, update, delete"}
+        arguments = {key: value for key, value in op.items() if key != "action"}
+        return await action(profile_id=profile_id, **arguments)
+    
+    try:
+        # Started together, so all changes are saved with a single update of the profile
+        results = await asyncio.gather(*[run_op(op) for op in ops], return_exceptions=True)
+        _operations[operation_id] = {
+            "status": "done",
+            "result": [{"error": "Invalid operation", "details": str(result)} if isinstance(result, Exception) else result for result in results]
+        }
+    except Exception as e:
+        _operations[operation_id] = {"status": "error", "result": {"error": "Bulk operation failed", "details": str(e)}}
+    
+    # Forget the oldest finished operations
+    finished = [key for key, operation in _operations.items() if operation["status"] != "running"]
+    for key in finished[:-OPERATION_HISTORY_SIZE]:
+        del _operations[key]
+
+@mcp.tool()
+async def bulk_mutate_alarm_rules(profile_id: str, ops: list[dict]) -> Any:
+    """Create, update and delete many alarm rules of a device profile in the background.
+    
+    Use this tool when you need to:
+    - Apply many alarm rule changes to one device profile at once
+    - Set up or clean up a complete alarm configuration
+    - Make changes that may take longer than a single tool call is allowed to run
+    
+    The tool returns immediately with an operation ID. Use get_operation_status to check
+    whether the operation has finished and to get its result. All changes are saved
+    with a single update of the device profile.
+    
+    Args:
+        profile_id (str): The device profile ID containing the alarm rules
+        ops (list[dict]): The changes to make, in order. Each change has an "action" field
+                          ("create", "update" or "delete") and the arguments of the
+                          corresponding tool (create_alarm_rule, update_alarm_rule or
+                          delete_alarm_rule), except profile_id.
+                          Example: [{"action": "create", "alarm_type": "High Temperature", "condition_value": 40},
+                                    {"action": "delete", "alarm_id": "123e4567-e89b-12d3-a456-426614174000"}]
+    
+    Returns:
+        Dict containing:
+        - operation_id: ID to pass to get_operation_status
+    """
+    operation_id = str(uuid.uuid4())
+    _operations[operation_id] = {"status": "running", "result": None}
+    task = asyncio.create_task(_run_bulk_operation(operation_id, profile_id, ops))
+    _operation_tasks.add(task)
+    task.add_done_callback(_operation_tasks.discard)
+    return {"operation_id": operation_id}
+
+@mcp.tool()
+async def get_operation_status(operation_id: str) -> Any:
+    """Get the status and result of a bulk alarm rule operation.
+    
+    Use this tool when you need to:
+    - Check whether an operation started with bulk_mutate_alarm_rules has finished
+    - Get the results of the individual changes of a finished operation
+    
+    Args:
+        operation_id (str): The operation ID returned by bulk_mutate_alarm_rules
+    
+    Returns:
+        Dict containing:
+        - operation_id: The operation ID
+        - status: "running", "done" or "error"
+        - result: While running null; when done, the result of each change in order
+                  (the updated device profile or an error); on error, the error details
+    """
+    operation = _operations.get(operation_id)
+    if operation is None:
+        return {"error": f"Operation with ID {operation_id} not found"}
+    return {"operation_id": operation_id, **operation}
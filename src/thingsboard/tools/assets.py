@@ -3,6 +3,9 @@ from typing import Any
 from resources.thingsboard_client import ThingsboardClient
 from utils.helpers import filter_entity_information
 
+# Seconds for which asset lists are served from the cache
+ASSET_LIST_CACHE_TTL = 5
+
 @mcp.tool()
 async def get_tenant_assets(page: int = 0, page_size: int = 10) -> Any:
     """Retrieve a paginated list of IoT assets from ThingsBoard with essential information only.
@@ -36,14 +39,11 @@ async def get_tenant_assets(page: int = 0, page_size: int = 10) -> Any:
     """
     endpoint = "tenant/assets"
     params = {"page": page, "pageSize": page_size}
-    response = await ThingsboardClient.make_thingsboard_request(endpoint, params)
+    response = await ThingsboardClient.make_thingsboard_request(endpoint, params, cache_ttl=ASSET_LIST_CACHE_TTL)
     
     # Filter the response to include only essential fields
     if "data" in response and isinstance(response["data"], list):
-        filtered_assets = []
-        for asset in response["data"]:
-            filtered_asset = filter_entity_information(asset)
-            filtered_assets.append(filtered_asset)
+        filtered_assets = list(map(filter_entity_information, response["data"]))
         
         return {
             "data": filtered_assets,
@@ -3,6 +3,10 @@ from typing import Any
 from resources.thingsboard_client import ThingsboardClient
 from utils.helpers import filter_entity_information
 
+# Seconds for which device lists and attributes are served from the cache
+DEVICE_LIST_CACHE_TTL = 5
+DEVICE_ATTRIBUTES_CACHE_TTL = 30
+
 @mcp.tool()
 async def get_tenant_devices(page: int = 0, page_size: int = 10) -> Any:
     """Retrieve a paginated list of IoT devices from ThingsBoard with essential information only.
@@ -36,14 +40,11 @@ async def get_tenant_devices(page: int = 0, page_size: int = 10) -> Any:
     """
     endpoint = "tenant/devices"
     params = {"page": page, "pageSize": page_size}
-    response = await ThingsboardClient.make_thingsboard_request(endpoint, params)
+    response = await ThingsboardClient.make_thingsboard_request(endpoint, params, cache_ttl=DEVICE_LIST_CACHE_TTL)
     
     # Filter the response to include only essential fields
     if "data" in response and isinstance(response["data"], list):
-        filtered_devices = []
-        for device in response["data"]:
-            filtered_device = filter_entity_information(device)
-            filtered_devices.append(filtered_device)
+        filtered_devices = list(map(filter_entity_information, response["data"]))
         
         return {
             "data": filtered_devices,
@@ -86,4 +87,4 @@ async def get_device_attributes(device_id: str) -> Any:
         First get device list, then use a device ID from the results
     """
     endpoint = f"plugins/telemetry/DEVICE/{device_id}/values/attributes"
-    return await ThingsboardClient.make_thingsboard_request(endpoint)
\ No newline at end of file
+    return await ThingsboardClient.make_thingsboard_request(endpoint, cache_ttl=DEVICE_ATTRIBUTES_CACHE_TTL)
\ No newline at end of file
@@ -1,7 +1,16 @@
+import asyncio
+import time
 from resources.mcp_server import mcp
-from typing import Any
+from typing import Any, Optional
 from resources.thingsboard_client import ThingsboardClient
 
+# Seconds for which telemetry of a time range that has already ended is served from the cache
+HISTORIC_TELEMETRY_CACHE_TTL = 3600
+
+def _historic_cache_ttl(endTs: int) -> Optional[int]:
+    """Cache TTL for telemetry up to endTs: data of a past time range no longer changes, data of a current one does."""
+    return HISTORIC_TELEMETRY_CACHE_TTL if endTs < time.time() * 1000 else None
+
 @mcp.tool()
 async def get_historic_telemetry(id: str, entity_type: str, keys: str, startTs: int, endTs: int) -> Any:
     """Retrieve historical time-series data for a ThingsBoard device or asset within a specified time range.
@@ -41,7 +50,76 @@ async def get_historic_telemetry(id: str, entity_type: str, keys: str, startTs:
     """
     endpoint = f"plugins/telemetry/{entity_type}/{id}/values/timeseries"
     params = {"keys": keys, "startTs": startTs, "endTs": endTs}
-    return await ThingsboardClient.make_thingsboard_request(endpoint, params)
+    return await ThingsboardClient.make_thingsboard_request(endpoint, params, cache_ttl=_historic_cache_ttl(endTs))
+
+@mcp.tool()
+async def get_historic_telemetry_for_entities(ids: str, entity_type: str, keys: str, startTs: int, endTs: int) -> Any:
+    """Retrieve historical time-series data for several ThingsBoard devices or assets at once.
+    
+    Use this tool when you need to:
+    - Compare the same telemetry keys across multiple devices or assets over a time range
+    - Build multi-device reports or dashboards without calling get_historic_telemetry once per entity
+    - Analyze a fleet of devices (e.g. all devices returned by get_tenant_devices) for a specific period
+    
+    The data of all entities is fetched concurrently, so this is much faster than
+    retrieving the entities one by one. Each entity gets the same result format as get_historic_telemetry.
+    
+    Args:
+        ids (str): Comma-separated list of device or asset identifiers
+                  (e.g., "123e4567-e89b-12d3-a456-426614174000,223e4567-e89b-12d3-a456-426614174000").
+        entity_type (str): Type of the entities - must be either "DEVICE" or "ASSET" (case-sensitive).
+        keys (str): Comma-separated list of telemetry keys to retrieve (e.g., "temperature,humidity,pressure").
+        startTs (int): Start timestamp in milliseconds UTC (e.g., 1704067200000 for 2024-01-01 00:00:00 UTC).
+                      Must be less than endTs.
+        endTs (int): End timestamp in milliseconds UTC (e.g., 1704153600000 for 2024-01-02 00:00:00 UTC).
+                    Must be greater than startTs.
+    
+    Returns:
+        Dict mapping each entity id to its time-series data:
+        {id: {key: [{"ts": timestamp, "value": value}, ...]}}
+        Entities whose data could not be retrieved map to a dict with an "error" field.
+    
+    Example usage:
+        ids: "123e4567-e89b-12d3-a456-426614174000,223e4567-e89b-12d3-a456-426614174000"
+        keys: "temperature"
+        startTs: 1704067200000  # 2024-01-01 00:00:00 UTC
+        endTs: 1704153600000    # 2024-01-02 00:00:00 UTC
+        entity_type: "DEVICE"
+    """
+    entity_ids = list(dict.fromkeys(entity_id.strip() for entity_id in ids.split(",") if entity_id.strip()))
+    params = {"keys": keys, "startTs": startTs, "endTs": endTs}
+    cache_ttl = _historic_cache_ttl(endTs)
+    results = await asyncio.gather(
+        *[
+            ThingsboardClient.make_thingsboard_request(f"plugins/telemetry/{entity_type}/{entity_id}/values/timeseries", params, cache_ttl=cache_ttl)
+            for entity_id in entity_ids
+        ],
+        return_exceptions=True,
+    )
+    return {
+        entity_id: {"error": "Unable to fetch data from ThingsBoard", "details": str(result)} if isinstance(result, Exception) else result
+        for entity_id, result in zip(entity_ids, results)
+    }
+
+def _numeric_values(data_points: list) -> list:
+    """Convert the values of telemetry data points to floats, skipping the points without a numeric value."""
+    try:
+        # Usually every point has a numeric (string) value, so convert them all in one pass
+        return [float(point['value']) for point in data_points]
+    except (KeyError, ValueError, TypeError):
+        pass
+
+    values = []
+    for point in data_points:
+        if isinstance(point, dict) and 'value' in point:
+            try:
+                # Convert string value to float
+                value = float(point['value'])
+                values.append(value)
+            except (ValueError, TypeError):
+                # Skip non-numeric values
+                continue
+    return values
 
 @mcp.tool()
 async def get_average_telemetry(id: str, entity_type: str, keys: str, startTs: int, endTs: int) -> Any:
@@ -86,7 +164,7 @@ async def get_average_telemetry(id: str, entity_type: str, keys: str, startTs: i
     """
     endpoint = f"plugins/telemetry/{entity_type}/{id}/values/timeseries"
     params = {"keys": keys, "startTs": startTs, "endTs": endTs}
-    response = await ThingsboardClient.make_thingsboard_request(endpoint, params)
+    response = await ThingsboardClient.make_thingsboard_request(endpoint, params, cache_ttl=_historic_cache_ttl(endTs))
     
     # Calculate averages for each key
     averages = {}
@@ -94,16 +172,7 @@ async def get_average_telemetry(id: str, entity_type: str, keys: str, startTs: i
     for key, data_points in response.items():
         if isinstance(data_points, list) and data_points:
             # Extract numeric values and calculate average
-            values = []
-            for point in data_points:
-                if isinstance(point, dict) and 'value' in point:
-                    try:
-                        # Convert string value to float
-                        value = float(point['value'])
-                        values.append(value)
-                    except (ValueError, TypeError):
-                        # Skip non-numeric values
-                        continue
+            values = _numeric_values(data_points)
             
             if values:
                 average = sum(values) / len(values)
@@ -10,7 +10,17 @@ def filter_entity_information(device: dict, fields: list=None) -> dict:
         dict: Filtered device data
     """
     if not fields:
-        fields = ["id", "name", "type", "label", "deviceProfileId", "assetProfileId"]
+        # Default fields, built directly as this runs for every entity of a listing
+        entity_id = device.get("id") or {}
+        profile_id = device.get("deviceProfileId") or device.get("assetProfileId") or {}
+        return {
+            "id": entity_id.get("id"),
+            "entityType": entity_id.get("entityType"),
+            "name": device.get("name"),
+            "type": device.get("type"),
+            "label": device.get("label"),
+            "profileId": profile_id.get("id"),
+        }
     
     filtered_device = {}
     
@@ -24,10 +34,10 @@ def filter_entity_information(device: dict, fields: list=None) -> dict:
             filtered_device["type"] = device.get("type")
         elif field == "label":
             filtered_device["label"] = device.get("label")
-        elif field == "deviceProfileId":
-            filtered_device["profileId"] = device.get("deviceProfileId", {}).get("id")
-        elif field == "assetProfileId":
-            filtered_device["profileId"] = device.get("assetProfileId", {}).get("id")
+        elif field in ("deviceProfileId", "assetProfileId"):
+            # An entity has only one of the two, which the other must not overwrite
+            if field in device or "profileId" not in filtered_device:
+                filtered_device["profileId"] = device.get(field, {}).get("id")
         elif field in device:
             filtered_device[field] = device.get(field)
     